@@ -1,22 +1,48 @@
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, Response, request, make_response, g
 import os
 import logging
 import datetime
 import socket
+import sys
 import json
 import hashlib
+import hmac
+import math
+import collections
+import threading
 import time
 from functools import wraps
 
+from devops_latency import LatencyRegistry, cumulative_buckets
+from devops_shared import SharedCounters, master_table_path, process_start_time
+from devops_store import DeploymentStore
+from devops_logging import configure_logging, RequestLogSampler, parse_sample_rates
+from devops_logs import LogReader, LogFilter, LEVELS as LOG_LEVELS
+from devops_prometheus import MetricsExposition, CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE
+from devops_stream import StreamPublisher, StreamFull
+from devops_ingest import iter_json_array, iter_ndjson
+from devops_json import dumps as json_dumps, JsonTemplate, Dynamic, RawJson
+from devops_compress import ResponseCompressor
+from devops_probes import (ProbeScheduler, CallableProbe, DiskSpaceProbe, MemoryProbe, CpuProbe,
+                           parse_dependencies, PASSING, WARNING, FAILING)
+from devops_admission import AdmissionController, Rejected, parse_limits
+from devops_ids import IdGenerator
+from devops_pipeline import PipelineMetrics, JENKINS_RESULTS, format_duration
+from devops_profile import SamplingProfiler, ProfileBusy, format_collapsed
+from devops_timeseries import SystemSampler, METRICS as SYSTEM_METRICS, RESOLUTIONS as SYSTEM_RESOLUTIONS
+
 # Configure logging for DevOps monitoring
-logging.basicConfig(
+# Requests only enqueue records, a background writer formats and flushes them in batches
+LOG_FILE = os.environ.get('DEVOPS_LOG_FILE', 'app.log')
+log_listener = configure_logging(
     level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    fmt='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler('app.log') if os.path.exists('/tmp') else logging.StreamHandler()
+        logging.FileHandler(LOG_FILE, delay=True) if os.path.exists('/tmp') else logging.StreamHandler()
     ]
 )
+log_reader = LogReader(LOG_FILE)
 logger = logging.getLogger("DevOpsApp")
 
 app = Flask(__name__)
@@ -42,55 +68,306 @@ class DevOpsConfig:
     AWS_REGION = os.environ.get('AWS_DEFAULT_REGION', 'us-east-1')
     EC2_INSTANCE_ID = os.environ.get('EC2_INSTANCE_ID', 'local-instance')
 
+    # Shared metrics file for multi-worker deployments (defaults to one per gunicorn master)
+    METRICS_FILE = os.environ.get('DEVOPS_METRICS_FILE')
+
+    # Persistent deployment history (SQLite, shared by all workers)
+    DEPLOYMENT_DB = os.environ.get('DEVOPS_DEPLOYMENT_DB', 'devops.db')
+    DEPLOYMENT_RETENTION = int(os.environ.get('DEVOPS_DEPLOYMENT_RETENTION', '0'))  # 0 keeps everything
+
+    # Request log sampling, "endpoint=N" logs 1 in N requests to that endpoint
+    LOG_SAMPLE_RATES = os.environ.get('DEVOPS_LOG_SAMPLE_RATES', 'devops_health_check=1000')
+
+    # Dashboard render cache: counters shown on "/" are re-read at most this often
+    DASHBOARD_REFRESH_SECONDS = float(os.environ.get('DASHBOARD_REFRESH_SECONDS', '5'))
+
+    # Batch deployment ingestion, records per SQLite transaction
+    DEPLOY_BATCH_CHUNK = int(os.environ.get('DEVOPS_DEPLOY_BATCH_CHUNK', '500'))
+
+    # Response compression (gzip, brotli when installed); smaller bodies are sent as-is
+    COMPRESS_MIN_SIZE = int(os.environ.get('DEVOPS_COMPRESS_MIN_SIZE', '1024'))
+
+    # Live dashboard updates (/devops/stream): seconds between metric polls shared by all viewers
+    STREAM_INTERVAL = float(os.environ.get('DEVOPS_STREAM_INTERVAL', '2'))
+    # Under WSGI every viewer holds a worker thread: beyond this many per worker (and never out of
+    # the admission health reserve) viewers get a 503 and the dashboard falls back to polling
+    STREAM_MAX_SUBSCRIBERS = int(os.environ.get('DEVOPS_STREAM_MAX_SUBSCRIBERS', '2'))
+
+    # Health probes, refreshed in the background; dependencies as "name=tcp://host:port,name=http://url"
+    HEALTH_DEPENDENCIES = os.environ.get('DEVOPS_HEALTH_DEPENDENCIES', '')
+    HEALTH_PROBE_INTERVAL = float(os.environ.get('DEVOPS_HEALTH_PROBE_INTERVAL', '10'))
+    HEALTH_PROBE_TIMEOUT = float(os.environ.get('DEVOPS_HEALTH_PROBE_TIMEOUT', '2'))
+    HEALTH_DISK_PATH = os.environ.get('DEVOPS_HEALTH_DISK_PATH', '/')
+
+    # System metrics history (/devops/metrics/timeseries), seconds between samples
+    SYSTEM_SAMPLE_INTERVAL = float(os.environ.get('DEVOPS_SYSTEM_SAMPLE_INTERVAL', '1'))
+
+    # On-demand profiling (/devops/profile), disabled unless a token is set
+    PROFILE_TOKEN = os.environ.get('DEVOPS_PROFILE_TOKEN', '')
+    PROFILE_MAX_SECONDS = float(os.environ.get('DEVOPS_PROFILE_MAX_SECONDS', '60'))
+    STAGE_TIMERS = os.environ.get('DEVOPS_STAGE_TIMERS', '').lower() in ('1', 'true', 'yes', 'on')
+
+    # Admission control for the expensive routes, "endpoint=concurrency[:rate/burst]" (rate per second).
+    # Together they may hold ADMISSION_CAPACITY - ADMISSION_HEALTH_RESERVE worker threads (set the
+    # capacity to gunicorn's --threads); a request that can not start right away gets a 503
+    ADMISSION_LIMITS = os.environ.get(
+        'DEVOPS_ADMISSION_LIMITS',
+        'devops_dashboard=8,deployment_history=8,record_devops_deployment=4:50/100,'
+        'record_devops_deployment_batch=2:5/10'
+    )
+    ADMISSION_CAPACITY = int(os.environ.get('DEVOPS_ADMISSION_CAPACITY', '32'))
+    ADMISSION_HEALTH_RESERVE = int(os.environ.get('DEVOPS_ADMISSION_HEALTH_RESERVE', '4'))
+
+    # Jenkins build/stage webhooks (POST /devops/pipeline/events), the stages match the Jenkinsfile
+    PIPELINE_STAGES = os.environ.get('DEVOPS_PIPELINE_STAGES', 'Checkout,Build,Test,Deploy')
+    PIPELINE_DEPLOY_STAGE = os.environ.get('DEVOPS_PIPELINE_DEPLOY_STAGE', 'Deploy')
+    PIPELINE_WINDOW_DAYS = int(os.environ.get('DEVOPS_PIPELINE_WINDOW_DAYS', '30'))
+    PIPELINE_RETENTION_DAYS = int(os.environ.get('DEVOPS_PIPELINE_RETENTION_DAYS', '90'))  # 0 keeps everything
+
 app.config.from_object(DevOpsConfig)
 
-# DevOps Metrics Storage
-devops_metrics = {
-    'pipeline_runs': [],
-    'deployment_history': [],
-    'health_checks': 0,
-    'api_calls': 0,
-    'errors': 0,
-    'start_time': time.time(),
-    'build_artifacts': []
+# Deployment history and build artifacts, persisted with only a recent window in memory
+deployment_store = DeploymentStore(
+    app.config['DEPLOYMENT_DB'],
+    retention=app.config['DEPLOYMENT_RETENTION'],
+    pipeline_retention_days=app.config['PIPELINE_RETENTION_DAYS']
+)
+
+# DORA and pipeline aggregates, folded in from the Jenkins events every worker stores
+PIPELINE_STAGES = tuple(stage.strip() for stage in app.config['PIPELINE_STAGES'].split(',') if stage.strip())
+pipeline_metrics = PipelineMetrics(
+    deployment_store,
+    PIPELINE_STAGES,
+    deploy_stage=app.config['PIPELINE_DEPLOY_STAGE'],
+    window_days=app.config['PIPELINE_WINDOW_DAYS']
+)
+
+def shared_metrics_path():
+    """Counter file shared by all workers of this instance, None for a single process"""
+    if app.config['METRICS_FILE']:
+        return app.config['METRICS_FILE']
+    if 'gunicorn' in sys.modules:
+        # Resolved lazily in the worker, where the parent is the gunicorn master
+        return master_table_path(os.getppid())
+    return None
+
+def shared_metrics_generation():
+    """Start time of the gunicorn master, so a file left by a killed master whose pid was reused is reset"""
+    if app.config['METRICS_FILE'] or 'gunicorn' not in sys.modules:
+        return None
+    return process_start_time(os.getppid())
+
+# Request/health/error counters, merged across gunicorn workers
+devops_counters = SharedCounters(
+    ('api_calls', 'health_checks', 'errors'),
+    path=shared_metrics_path,
+    generation=shared_metrics_generation
+)
+
+# Load balancers poll /devops/health constantly, only a sample of those requests is logged
+request_log_sampler = RequestLogSampler(parse_sample_rates(app.config['LOG_SAMPLE_RATES']))
+
+# Per-endpoint latency histograms (perf_counter is monotonic, so it also drives the windows)
+request_latency = LatencyRegistry(time.perf_counter)
+
+# Health probes run on their own threads, /devops/health only reads the latest results
+_probe_options = {
+    'interval': app.config['HEALTH_PROBE_INTERVAL'],
+    'timeout': app.config['HEALTH_PROBE_TIMEOUT']
 }
+health_probes = ProbeScheduler([
+    CallableProbe('database', deployment_store.ping, **_probe_options),
+    DiskSpaceProbe(path=app.config['HEALTH_DISK_PATH'], **_probe_options),
+    MemoryProbe(**_probe_options),
+    CpuProbe(**_probe_options),
+    *parse_dependencies(app.config['HEALTH_DEPENDENCIES'], **_probe_options)
+])
+
+# CPU, memory and disk sampled in the background into fixed-size 1s/1m/1h rings
+system_sampler = SystemSampler(
+    interval=app.config['SYSTEM_SAMPLE_INTERVAL'],
+    disk_path=app.config['HEALTH_DISK_PATH']
+)
+
+# Per-stage request timings ("endpoint:stage" histograms), see /devops/profile/stages.
+# Disabled by default, and then the uninstrumented hooks are installed, so they cost nothing
+stage_latency = LatencyRegistry(time.perf_counter) if app.config['STAGE_TIMERS'] else None
 
 # Middleware for DevOps monitoring
-@app.before_request
 def track_requests():
-    devops_metrics['api_calls'] += 1
+    endpoint = count_request()
+    if sample_request_log(endpoint):
+        log_api_call(endpoint)
+
+def track_requests_timed():
+    """track_requests, recording how long counting, sampling and logging each took"""
+    endpoint = count_request()
+    started = g.request_timer[0]
+    counted = time.perf_counter()
+    log = sample_request_log(endpoint)
+    sampled = time.perf_counter()
+    if log:
+        log_api_call(endpoint)
+    logged = time.perf_counter()
+    stage_latency.record(f"{endpoint}:counters", counted - started, counted)
+    stage_latency.record(f"{endpoint}:log_sampling", sampled - counted, sampled)
+    stage_latency.record(f"{endpoint}:logging", logged - sampled, logged)
+
+def count_request():
+    started = time.perf_counter()
+    system_sampler.ensure_started()  # history starts with the worker's first request
+    devops_counters.incr('api_calls')
     endpoint = request.endpoint or 'unknown'
-    logger.info(f"API Call #{devops_metrics['api_calls']} | {request.method} {request.path} | Endpoint: {endpoint}")
+    # The endpoint's histogram is bound here, so recording the latency needs nothing else from the request
+    g.request_timer = (started, request_latency.histogram_for(endpoint))
+    return endpoint
+
+def sample_request_log(endpoint):
+    """Whether this request is logged (the decision is kept in g for the error handlers)"""
+    g.log_sampled = request_log_sampler.should_log(endpoint)
+    return g.log_sampled and logger.isEnabledFor(logging.INFO)
+
+def log_api_call(endpoint):
+    rate = request_log_sampler.rate(endpoint)
+    if rate > 1:
+        logger.info("API Call #%d | %s %s | Endpoint: %s | Sampled 1/%d",
+                    devops_counters.value('api_calls'), request.method, request.path, endpoint, rate)
+    else:
+        logger.info("API Call #%d | %s %s | Endpoint: %s",
+                    devops_counters.value('api_calls'), request.method, request.path, endpoint)
+
+app.before_request(track_requests_timed if stage_latency is not None else track_requests)
+
+def record_request_latency():
+    timer = g.pop('request_timer', None)
+    if timer is not None:
+        started, histogram = timer
+        now = time.perf_counter()
+        histogram.record(now - started, now)
+
+@app.after_request
+def track_request_latency(response):
+    record_request_latency()
+    return response
+
+@app.teardown_request
+def track_failed_request_latency(error=None):
+    # after_request is skipped when a view raises, record those requests here
+    record_request_latency()
+
+# Registered after the latency hook so it runs first: compression time counts towards latency
+response_compressor = ResponseCompressor(min_size=app.config['COMPRESS_MIN_SIZE'])
+
+@app.after_request
+def compress_response(response):
+    return response_compressor(request, response)
+
+# Overload protection, registered after track_requests so shed requests are still counted
+admission = AdmissionController(
+    parse_limits(app.config['ADMISSION_LIMITS']),
+    capacity=app.config['ADMISSION_CAPACITY'],
+    reserve=app.config['ADMISSION_HEALTH_RESERVE']
+)
+
+@app.before_request
+def admit_request():
+    try:
+        g.admission = admission.admit(request.endpoint)
+    except Rejected as rejected:
+        if g.log_sampled:
+            logger.warning("Shedding %s %s: %s, retry after %ds",
+                           request.method, request.path, rejected.reason, rejected.retry_after)
+        # Nothing reads the body of a shed request: drop it here, otherwise the server has to drain
+        # it before the keep-alive connection can carry the next request, and may close it instead
+        while request.stream.read(65536):
+            pass
+        return service_unavailable(f"Request {rejected.reason}, retry later", rejected.retry_after)
+
+def service_unavailable(message, retry_after):
+    response = encode_api_result(({
+        "error": "Service Unavailable",
+        "message": message,
+        "retry_after": retry_after,
+        "status_code": 503,
+        "timestamp": datetime.datetime.utcnow().isoformat()
+    }, 503))
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.teardown_request
+def release_admission(error=None):
+    limit = g.pop('admission', None)
+    if limit is not None:
+        admission.release(limit)
 
 # DevOps utility functions
 def get_uptime():
-    uptime_seconds = int(time.time() - devops_metrics['start_time'])
+    uptime_seconds = int(time.time() - devops_counters.started_at)
     hours = uptime_seconds // 3600
     minutes = (uptime_seconds % 3600) // 60
     return f"{hours}h {minutes}m"
 
-def generate_build_hash():
-    """Generate unique build hash for artifacts"""
-    data = f"{app.config['BUILD_NUMBER']}{app.config['GIT_COMMIT_SHA']}{time.time()}"
-    return hashlib.md5(data.encode()).hexdigest()[:8]
+# Time-sortable ids, unique across threads, workers and instances without locking
+build_ids = IdGenerator()
+
+def generate_build_id():
+    """Unique, time-ordered id for artifacts, deployments and incidents"""
+    return build_ids.new_id()
 
 # JSON response decorator
+def json_body(body, status=200):
+    """Response for an already-serialized JSON body"""
+    return app.response_class(body, status=status, mimetype='application/json')
+
+def encode_api_result(result):
+    if isinstance(result, dict):
+        return json_body(json_dumps(result) + b'\n')
+    if isinstance(result, bytes):
+        return json_body(result)
+    if isinstance(result, tuple) and isinstance(result[0], dict):
+        return json_body(json_dumps(result[0]) + b'\n', result[1])
+    return result
+
+def api_error_response(func, e):
+    devops_counters.incr('errors')
+    logger.error("API Error in %s: %s", func.__name__, e)
+    return json_body(json_dumps({
+        "error": "Internal Server Error",
+        "message": "DevOps pipeline encountered an error",
+        "timestamp": datetime.datetime.utcnow().isoformat()
+    }) + b'\n', 500)
+
 def json_api_response(func):
+    """Views may return a dict, (dict, status), pre-serialized JSON bytes or a Response"""
+    if stage_latency is not None:
+        return timed_json_api_response(func)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
+            return encode_api_result(func(*args, **kwargs))
+        except Exception as e:
+            return api_error_response(func, e)
+    return wrapper
+
+def timed_json_api_response(func):
+    """json_api_response, recording the view and serialization stages separately"""
+    view_stage = f"{func.__name__}:view"
+    serialize_stage = f"{func.__name__}:serialize"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            started = time.perf_counter()
             result = func(*args, **kwargs)
-            if isinstance(result, dict):
-                return jsonify(result)
-            return result
+            viewed = time.perf_counter()
+            response = encode_api_result(result)
+            encoded = time.perf_counter()
+            stage_latency.record(view_stage, viewed - started, viewed)
+            stage_latency.record(serialize_stage, encoded - viewed, encoded)
+            return response
         except Exception as e:
-            devops_metrics['errors'] += 1
-            logger.error(f"API Error in {func.__name__}: {str(e)}")
-            return jsonify({
-                "error": "Internal Server Error",
-                "message": "DevOps pipeline encountered an error",
-                "timestamp": datetime.datetime.utcnow().isoformat()
-            }), 500
+            return api_error_response(func, e)
     return wrapper
 
 # DevOps Dashboard HTML Template
@@ -202,8 +479,9 @@ DEVOPS_DASHBOARD = """
                 <p><strong>Environment:</strong> {{ environment }}</p>
                 <p><strong>AWS Region:</strong> {{ aws_region }}</p>
                 <p><strong>EC2 Instance:</strong> {{ instance_id }}</p>
-                <p><strong>Uptime:</strong> {{ uptime }}</p>
+                <p><strong>Uptime:</strong> <span id="uptime">{{ uptime }}</span></p>
                 <p><strong>Version:</strong> {{ version }}</p>
+                <p><strong>Last Deployment:</strong> <span id="last-deployment">-</span></p>
             </div>
 
             <div class="card system-info">
@@ -219,19 +497,19 @@ DEVOPS_DASHBOARD = """
                 <h3>DevOps Metrics</h3>
                 <div class="metrics-grid">
                     <div class="metric">
-                        <div class="metric-value">{{ api_calls }}</div>
+                        <div class="metric-value" id="api-calls">{{ api_calls }}</div>
                         <div class="metric-label">API Calls</div>
                     </div>
                     <div class="metric">
-                        <div class="metric-value">{{ health_checks }}</div>
+                        <div class="metric-value" id="health-checks">{{ health_checks }}</div>
                         <div class="metric-label">Health Checks</div>
                     </div>
                     <div class="metric">
-                        <div class="metric-value">{{ deployments }}</div>
+                        <div class="metric-value" id="deployments">{{ deployments }}</div>
                         <div class="metric-label">Deployments</div>
                     </div>
                     <div class="metric">
-                        <div class="metric-value">{{ errors }}</div>
+                        <div class="metric-value" id="errors">{{ errors }}</div>
                         <div class="metric-label">Errors</div>
                     </div>
                 </div>
@@ -248,14 +526,38 @@ DEVOPS_DASHBOARD = """
                         <span class="api-method">GET</span> <strong>/devops/pipeline</strong>
                         <br><small>CI/CD pipeline status and metrics</small>
                     </div>
+                    <div class="api-endpoint">
+                        <span class="api-method api-post">POST</span> <strong>/devops/pipeline/events</strong>
+                        <br><small>Jenkins build and stage webhooks</small>
+                    </div>
+                    <div class="api-endpoint">
+                        <span class="api-method">GET</span> <strong>/devops/pipeline/dora</strong>
+                        <br><small>Deployment frequency, change failure rate, lead time</small>
+                    </div>
                     <div class="api-endpoint">
                         <span class="api-method api-post">POST</span> <strong>/devops/deploy</strong>
                         <br><small>Record new deployment (called by Jenkins)</small>
                     </div>
+                    <div class="api-endpoint">
+                        <span class="api-method api-post">POST</span> <strong>/devops/deploy/batch</strong>
+                        <br><small>Record many deployments (JSON array or NDJSON)</small>
+                    </div>
+                    <div class="api-endpoint">
+                        <span class="api-method">GET</span> <strong>/devops/artifacts/&lt;id&gt;</strong>
+                        <br><small>Build artifact by id, or search by ?name= / ?version=</small>
+                    </div>
                     <div class="api-endpoint">
                         <span class="api-method">GET</span> <strong>/devops/metrics</strong>
                         <br><small>Application performance metrics</small>
                     </div>
+                    <div class="api-endpoint">
+                        <span class="api-method">GET</span> <strong>/devops/metrics/timeseries</strong>
+                        <br><small>CPU, memory and disk history (1s/1m/1h)</small>
+                    </div>
+                    <div class="api-endpoint">
+                        <span class="api-method">GET</span> <strong>/devops/stream</strong>
+                        <br><small>Live metric updates (Server-Sent Events)</small>
+                    </div>
                     <div class="api-endpoint">
                         <span class="api-method">GET</span> <strong>/devops/infrastructure</strong>
                         <br><small>AWS infrastructure information</small>
@@ -266,249 +568,968 @@ DEVOPS_DASHBOARD = """
 
         <div class="footer">
             <p>🚀 DevOps Flask Application | Automated CI/CD with Jenkins | Deployed on AWS EC2</p>
-            <p>Last Updated: {{ timestamp }}</p>
+            <p>Last Updated: <span id="timestamp">{{ timestamp }}</span></p>
         </div>
     </div>
 
     <script>
-        // Auto-refresh every 30 seconds
-        setTimeout(() => location.reload(), 30000);
+        // Live updates: the server pushes only the fields that changed
+        const fields = {
+            uptime: 'uptime', api_calls: 'api-calls', health_checks: 'health-checks',
+            deployments: 'deployments', errors: 'errors'
+        };
+        function apply(data) {
+            for (const [key, id] of Object.entries(fields)) {
+                if (key in data) document.getElementById(id).textContent = data[key];
+            }
+            if (data.last_deployment) {
+                const d = data.last_deployment;
+                document.getElementById('last-deployment').textContent =
+                    `${d.deployment_id} (${d.environment}, ${d.status})`;
+            }
+            document.getElementById('timestamp').textContent =
+                new Date().toISOString().replace('T', ' ').slice(0, 19) + ' UTC';
+        }
+        const poll = () => setTimeout(() => location.reload(), 30000);
+        if (window.EventSource) {
+            const stream = new EventSource('/devops/stream');
+            stream.addEventListener('snapshot', e => apply(JSON.parse(e.data)));
+            stream.addEventListener('delta', e => apply(JSON.parse(e.data)));
+            // Refused (503) when the worker has no thread to spare, the browser does not retry then
+            stream.onerror = () => { if (stream.readyState === EventSource.CLOSED) poll(); };
+        } else {
+            poll();
+        }
     </script>
 </body>
 </html>
 """
 
+# Dashboard render cache
+class DashboardCache:
+    """Compiled dashboard template that only re-renders when the displayed fields change"""
+
+    def __init__(self, source, refresh_seconds):
+        self.source = source
+        self.refresh_seconds = refresh_seconds
+        self._template = None
+        self._static_context = None
+        self._entry = None  # (key, body, etag, rendered_at)
+        self._lock = threading.Lock()
+
+    def compile(self):
+        # Everything that is fixed for the lifetime of the process is resolved once
+        self._static_context = {
+            'app_name': app.config['APP_NAME'],
+            'build_number': app.config['BUILD_NUMBER'],
+            'git_commit': app.config['GIT_COMMIT_SHA'],
+            'git_branch': app.config['GIT_BRANCH'],
+            'environment': app.config['ENVIRONMENT'],
+            'version': app.config['VERSION'],
+            'job_name': app.config['JENKINS_JOB_NAME'],
+            'build_url': app.config['JENKINS_BUILD_URL'],
+            'aws_region': app.config['AWS_REGION'],
+            'instance_id': app.config['EC2_INSTANCE_ID'],
+            'hostname': socket.gethostname(),
+            'python_version': ".".join(map(str, [3, 9])),  # Simplified version
+        }
+        self._template = app.jinja_env.from_string(self.source)
+
+    def _dynamic_fields(self):
+        counters = devops_counters.snapshot()
+        return (
+            get_uptime(),
+            counters['api_calls'],
+            counters['health_checks'],
+            deployment_store.total_deployments(),
+            counters['errors'],
+        )
+
+    def get(self):
+        """Return (body, etag) for the current dashboard state"""
+        entry = self._entry
+        now = time.time()
+        if entry is not None and now - entry[3] < self.refresh_seconds:
+            return entry[1], entry[2]
+
+        key = self._dynamic_fields()
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2]
+
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != key:
+                if self._template is None:
+                    self.compile()
+                uptime, api_calls, health_checks, deployments, errors = key
+                body = self._template.render(
+                    self._static_context,
+                    uptime=uptime,
+                    api_calls=api_calls,
+                    health_checks=health_checks,
+                    deployments=deployments,
+                    errors=errors,
+                    timestamp=datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
+                ).encode('utf-8')
+                etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+                entry = (key, body, etag, now)
+                self._entry = entry
+            return entry[1], entry[2]
+
+dashboard_cache = DashboardCache(DEVOPS_DASHBOARD, app.config['DASHBOARD_REFRESH_SECONDS'])
+
 # Routes - DevOps Dashboard
 @app.route("/")
 def devops_dashboard():
     """Main DevOps dashboard"""
-    return render_template_string(DEVOPS_DASHBOARD,
-        app_name=app.config['APP_NAME'],
-        build_number=app.config['BUILD_NUMBER'],
-        git_commit=app.config['GIT_COMMIT_SHA'],
-        git_branch=app.config['GIT_BRANCH'],
-        environment=app.config['ENVIRONMENT'],
-        version=app.config['VERSION'],
-        job_name=app.config['JENKINS_JOB_NAME'],
-        build_url=app.config['JENKINS_BUILD_URL'],
-        aws_region=app.config['AWS_REGION'],
-        instance_id=app.config['EC2_INSTANCE_ID'],
-        hostname=socket.gethostname(),
-        python_version=".".join(map(str, [3, 9])),  # Simplified version
-        uptime=get_uptime(),
-        api_calls=devops_metrics['api_calls'],
-        health_checks=devops_metrics['health_checks'],
-        deployments=len(devops_metrics['deployment_history']),
-        errors=devops_metrics['errors'],
-        timestamp=datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
-    )
+    body, etag = dashboard_cache.get()
+    response = make_response(body)
+    response.mimetype = 'text/html'
+    response.set_etag(etag)
+    # Browsers must revalidate, so a reload of an unchanged dashboard is a bodyless 304
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def dashboard_state():
+    """Fields the dashboard keeps live, polled once per tick for every viewer"""
+    counters = devops_counters.snapshot()
+    latest = deployment_store.recent_deployments(1)
+    return {
+        "uptime": get_uptime(),
+        "api_calls": counters['api_calls'],
+        "health_checks": counters['health_checks'],
+        "deployments": deployment_store.total_deployments(),
+        "errors": counters['errors'],
+        "last_deployment": {
+            "deployment_id": latest[0]['deployment_id'],
+            "environment": latest[0]['environment'],
+            "status": latest[0]['status'],
+            "timestamp": latest[0]['timestamp']
+        } if latest else None
+    }
+
+dashboard_stream = StreamPublisher(
+    dashboard_state,
+    interval=app.config['STREAM_INTERVAL'],
+    max_subscribers=app.config['STREAM_MAX_SUBSCRIBERS']
+)
+
+@app.route("/devops/stream")
+def devops_stream():
+    """Server-Sent Events feed of dashboard metric changes (served natively in ASGI mode, see asgi.py)"""
+    # A 503 makes the dashboard's EventSource give up and poll instead
+    retry_after = max(int(app.config['DASHBOARD_REFRESH_SECONDS']), 1)
+    if not request.environ.get('wsgi.multithread'):
+        return service_unavailable("Live updates need a threaded or ASGI worker", retry_after)
+    # Viewers hold a thread for as long as the page is open: they share the slots of the
+    # admission-controlled routes, so they can never take the threads reserved for health checks
+    if not admission.hold():
+        return service_unavailable("No thread free for live updates, poll instead", retry_after)
+    try:
+        frames = dashboard_stream.subscribe()
+    except StreamFull:
+        admission.unhold()
+        return service_unavailable("Too many live viewers on this worker, poll instead", retry_after)
+    response = Response(frames, mimetype='text/event-stream')
+    response.call_on_close(admission.unhold)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering the stream
+    return response
+
+# Everything in the health payload except these fields is fixed for the life of the process
+HEALTH_PAYLOAD = JsonTemplate(lambda: {
+    "status": Dynamic('status'),
+    "service": app.config['APP_NAME'],
+    "environment": app.config['ENVIRONMENT'],
+    "version": app.config['VERSION'],
+    "build": app.config['BUILD_NUMBER'],
+    "commit": app.config['GIT_COMMIT_SHA'],
+    "timestamp": Dynamic('timestamp'),
+    "uptime": Dynamic('uptime'),
+    "checks": Dynamic('checks'),
+    "probes": Dynamic('probes'),
+    "metrics": {
+        "response_time_ms": Dynamic('response_time_ms'),
+        "response_time_p99_ms": Dynamic('response_time_p99_ms'),
+        "cpu_usage": Dynamic('cpu_usage'),
+        "memory_usage": Dynamic('memory_usage')
+    }
+})
+
+_health_view = (None, None)  # (probe snapshot, derived fields), the snapshot is replaced, never mutated
+
+def health_view(probes):
+    """Checks, overall state and pre-serialized probe details for one probe snapshot"""
+    global _health_view
+    snapshot, view = _health_view
+    if snapshot is probes:
+        return view
+    checks = {"application": PASSING}
+    checks.update((name, result['status']) for name, result in probes.items())
+    # Stays 200 while degraded, a slow dependency should not take every instance out of rotation
+    healthy = not any(status in (WARNING, FAILING) for status in checks.values())
+    cpu = probes['cpu'].get('usage_percent')
+    rss = probes['memory'].get('process_rss_bytes')
+    view = {
+        "healthy": healthy,
+        "failing": [name for name, status in checks.items() if status in (WARNING, FAILING)],
+        "status": "healthy" if healthy else "degraded",
+        "checks": RawJson(json_dumps(checks)),
+        "probes": RawJson(json_dumps(probes)),
+        "cpu_usage": f"{cpu:g}%" if cpu is not None else None,
+        "memory_usage": f"{rss // (1024 * 1024)}MB" if rss is not None else None
+    }
+    _health_view = (probes, view)
+    return view
 
 @app.route("/devops/health")
 @json_api_response
 def devops_health_check():
     """DevOps Health Check - Critical for monitoring"""
-    devops_metrics['health_checks'] += 1
+    devops_counters.incr('health_checks')
+    latency = request_latency.overall_summary()['1m']
+    view = health_view(health_probes.snapshot())
     
-    health_data = {
-        "status": "healthy",
-        "service": app.config['APP_NAME'],
-        "environment": app.config['ENVIRONMENT'],
-        "version": app.config['VERSION'],
-        "build": app.config['BUILD_NUMBER'],
-        "commit": app.config['GIT_COMMIT_SHA'],
-        "timestamp": datetime.datetime.utcnow().isoformat(),
-        "uptime": get_uptime(),
-        "checks": {
-            "application": "passing",
-            "database": "passing",
-            "external_apis": "passing",
-            "disk_space": "passing",
-            "memory": "passing"
-        },
-        "metrics": {
-            "response_time_ms": 45,
-            "cpu_usage": "12%",
-            "memory_usage": "156MB",
-            "active_connections": 5
+    body = HEALTH_PAYLOAD.render(
+        status=view['status'],
+        timestamp=datetime.datetime.utcnow().isoformat(),
+        uptime=get_uptime(),
+        checks=view['checks'],
+        probes=view['probes'],
+        response_time_ms=latency['p50_ms'],
+        response_time_p99_ms=latency['p99_ms'],
+        cpu_usage=view['cpu_usage'],
+        memory_usage=view['memory_usage']
+    )
+    
+    if g.get('log_sampled', True) and not view['healthy']:
+        logger.warning("DevOps Health Check #%d - Degraded: %s", devops_counters.value('health_checks'), ', '.join(view['failing']))
+    elif g.get('log_sampled', True):
+        logger.info("DevOps Health Check #%d - All systems operational", devops_counters.value('health_checks'))
+    return body
+
+PIPELINE_PAYLOAD = JsonTemplate(lambda: {
+    "pipeline": {
+        "name": app.config['JENKINS_JOB_NAME'],
+        "status": Dynamic('status'),
+        "build_number": Dynamic('build_number'),
+        "build_url": Dynamic('build_url'),
+        "last_run": Dynamic('last_run'),
+        "duration": Dynamic('duration'),
+        "triggered_by": Dynamic('triggered_by')
+    },
+    "git": Dynamic('git'),
+    "stages": Dynamic('stages'),
+    "artifacts": Dynamic('artifacts')
+})
+
+_pipeline_view = (None, None)  # (pipeline report, rendered fields), reports are replaced, never mutated
+
+def pipeline_view(report):
+    """Template fields for the newest build, derived once per pipeline report"""
+    global _pipeline_view
+    cached, view = _pipeline_view
+    if cached is report:
+        return view
+    build = report['last_build']
+    if build is None:
+        # Nothing reported by Jenkins yet: describe the build this instance was deployed from
+        build = {
+            "build_number": app.config['BUILD_NUMBER'],
+            "build_url": app.config['JENKINS_BUILD_URL'],
+            "git_branch": app.config['GIT_BRANCH'],
+            "git_commit": app.config['GIT_COMMIT_SHA']
+        }
+    stages = {}
+    for stage, summary in report['stages'].items():
+        last = summary['last'] or {}
+        stages[stage.lower()] = {
+            "status": last.get('status'),
+            "duration": last.get('duration'),
+            "build_number": last.get('build_number'),
+            "p50_seconds": summary['duration']['p50_seconds'],
+            "p95_seconds": summary['duration']['p95_seconds']
         }
+    view = {
+        "status": build.get('status'),
+        "build_number": build['build_number'],
+        "build_url": build.get('build_url'),
+        "last_run": datetime.datetime.utcfromtimestamp(build['ts']).isoformat() if 'ts' in build else None,
+        "duration": format_duration(build['duration_ms'] / 1000.0) if 'duration_ms' in build else None,
+        "triggered_by": build.get('triggered_by'),
+        "git": RawJson(json_dumps({
+            "branch": build.get('git_branch'),
+            "commit_sha": build.get('git_commit'),
+            "commit_message": build.get('commit_message'),
+            "author": build.get('author')
+        })),
+        "stages": RawJson(json_dumps(stages))
     }
-    
-    logger.info(f"DevOps Health Check #{devops_metrics['health_checks']} - All systems operational")
-    return health_data
+    _pipeline_view = (report, view)
+    return view
+
+_artifacts_json = (None, 0, RawJson(b'[]'))  # (newest artifact, count, serialized list)
+
+def recent_artifacts_json():
+    """The artifact window serialized once per deploy rather than once per request"""
+    global _artifacts_json
+    artifacts = deployment_store.recent_artifacts(deployment_store.ring_size)
+    newest = artifacts[-1] if artifacts else None
+    cached_newest, cached_count, body = _artifacts_json
+    if newest is not cached_newest or len(artifacts) != cached_count:
+        body = RawJson(json_dumps(artifacts))
+        _artifacts_json = (newest, len(artifacts), body)
+    return body
 
 @app.route("/devops/pipeline")
 @json_api_response
 def pipeline_status():
     """Jenkins Pipeline Status & Information"""
+    return PIPELINE_PAYLOAD.render(
+        artifacts=recent_artifacts_json(),
+        **pipeline_view(pipeline_metrics.report())
+    )
+
+# Jenkins event fields kept, by type; anything else in a webhook payload is dropped
+PIPELINE_EVENT_FIELDS = ('job', 'build_number', 'status', 'build_url', 'triggered_by', 'git_branch',
+                         'git_commit', 'commit_message', 'author')
+
+def parse_pipeline_event(entry, now):
+    """Validate one Jenkins build/stage event, returns the normalized event or raises ValueError"""
+    if not isinstance(entry, dict):
+        raise ValueError("event must be a JSON object")
+    kind = entry.get('event')
+    if kind not in ('build', 'stage'):
+        raise ValueError("event must be 'build' or 'stage'")
+    event = {"event": kind, "job": app.config['JENKINS_JOB_NAME']}
+    for name in PIPELINE_EVENT_FIELDS:
+        value = entry.get(name)
+        if isinstance(value, int) and not isinstance(value, bool) and name == 'build_number':
+            value = str(value)
+        if value is None:
+            continue
+        if not isinstance(value, str) or not value or len(value) > (1024 if name == 'commit_message' else 256):
+            raise ValueError(f"{name} must be a non-empty string")
+        event[name] = value
+    if 'build_number' not in event:
+        raise ValueError("build_number is required")
+    event['status'] = str(entry.get('status', '')).upper()
+    if event['status'] not in JENKINS_RESULTS:
+        raise ValueError(f"status must be one of {', '.join(JENKINS_RESULTS)}")
+    duration = entry.get('duration_ms')
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or not 0 <= duration < 2 ** 40:
+        raise ValueError("duration_ms must be a non-negative number")
+    event['duration_ms'] = duration
+    try:
+        event['ts'] = parse_time_param(str(entry['timestamp'])) if entry.get('timestamp') is not None else now
+        if entry.get('commit_timestamp') is not None:
+            event['commit_ts'] = parse_time_param(str(entry['commit_timestamp']))
+    except (ValueError, OverflowError):
+        raise ValueError("timestamp and commit_timestamp must be unix seconds or ISO-8601") from None
+    if not all(representable_timestamp(event[name]) for name in ('ts', 'commit_ts') if name in event):
+        raise ValueError("timestamp and commit_timestamp must be between years 1 and 9999")
+    if kind == 'stage':
+        stage = {name.lower(): name for name in PIPELINE_STAGES}.get(str(entry.get('stage', '')).lower())
+        if stage is None:
+            raise ValueError(f"stage must be one of {', '.join(PIPELINE_STAGES)}")
+        event['stage'] = stage
+        coverage = entry.get('test_coverage')
+        if coverage is not None:
+            if isinstance(coverage, bool) or not isinstance(coverage, (int, float)) or not 0 <= coverage <= 100:
+                raise ValueError("test_coverage must be a percentage")
+            event['test_coverage'] = coverage
+    return event
+
+@app.route("/devops/pipeline/events", methods=['POST'])
+@json_api_response
+def record_pipeline_events():
+    """Jenkins build and stage webhooks, one event object or an array of them"""
+    body = request.get_json(silent=True)
+    entries = body if isinstance(body, list) else [body]
+    if body is None or not entries or len(entries) > 1000:
+        return bad_request("body must be a JSON event object or an array of 1 to 1000 of them")
+    now = time.time()
+    results, events = [], []
+    for index, entry in enumerate(entries):
+        try:
+            events.append(parse_pipeline_event(entry, now))
+            results.append({"index": index, "status": "recorded"})
+        except ValueError as e:
+            results.append({"index": index, "status": "invalid", "error": str(e)})
+    recorded = iter(deployment_store.record_pipeline_events(events))
+    for result in results:
+        if result["status"] == "recorded" and not next(recorded):
+            result["status"] = "duplicate"
+    summary = collections.Counter(result["status"] for result in results)
     return {
-        "pipeline": {
-            "name": app.config['JENKINS_JOB_NAME'],
-            "status": "SUCCESS",
-            "build_number": app.config['BUILD_NUMBER'],
-            "build_url": app.config['JENKINS_BUILD_URL'],
-            "last_run": datetime.datetime.utcnow().isoformat(),
-            "duration": "2m 34s",
-            "triggered_by": "GitHub webhook"
-        },
-        "git": {
-            "branch": app.config['GIT_BRANCH'],
-            "commit_sha": app.config['GIT_COMMIT_SHA'],
-            "commit_message": "feat: enhanced devops monitoring endpoints",
-            "author": "DevOps Engineer"
-        },
-        "stages": {
-            "checkout": {"status": "SUCCESS", "duration": "15s"},
-            "build": {"status": "SUCCESS", "duration": "45s"},
-            "test": {"status": "SUCCESS", "duration": "30s"},
-            "deploy": {"status": "SUCCESS", "duration": "1m 24s"}
-        },
-        "artifacts": devops_metrics['build_artifacts']
+        "message": "Pipeline events processed",
+        "received": len(results),
+        "recorded": summary['recorded'],
+        "duplicates": summary['duplicate'],
+        "invalid": summary['invalid'],
+        "results": results
     }
 
-@app.route("/devops/deploy", methods=['POST'])
+@app.route("/devops/pipeline/dora")
 @json_api_response
-def record_devops_deployment():
-    """Record deployment - Called by Jenkins Pipeline"""
-    build_hash = generate_build_hash()
-    
+def pipeline_dora():
+    """Deployment frequency, change failure rate, lead time and stage durations over the rolling window"""
+    return pipeline_metrics.report()
+
+# Deployment record fields a batch entry may set, everything else comes from the app config
+DEPLOYMENT_FIELDS = ('environment', 'version', 'build_number', 'git_commit', 'git_branch',
+                     'deployed_by', 'deployment_strategy', 'status')
+
+def new_deployment(build_id, now, fields=None):
+    """Deployment and build artifact records, defaults from this instance's config"""
+    fields = fields or {}
+    timestamp = datetime.datetime.utcfromtimestamp(now).isoformat()
     deployment = {
-        "deployment_id": f"deploy-{build_hash}",
-        "timestamp": datetime.datetime.utcnow().isoformat(),
-        "environment": app.config['ENVIRONMENT'],
-        "version": app.config['VERSION'],
-        "build_number": app.config['BUILD_NUMBER'],
-        "git_commit": app.config['GIT_COMMIT_SHA'],
-        "git_branch": app.config['GIT_BRANCH'],
-        "deployed_by": "Jenkins CI/CD Pipeline",
-        "deployment_strategy": "rolling",
+        "deployment_id": fields.get('deployment_id') or f"deploy-{build_id}",
+        "timestamp": timestamp,
+        "environment": fields.get('environment', app.config['ENVIRONMENT']),
+        "version": fields.get('version', app.config['VERSION']),
+        "build_number": fields.get('build_number', app.config['BUILD_NUMBER']),
+        "git_commit": fields.get('git_commit', app.config['GIT_COMMIT_SHA']),
+        "git_branch": fields.get('git_branch', app.config['GIT_BRANCH']),
+        "deployed_by": fields.get('deployed_by', "Jenkins CI/CD Pipeline"),
+        "deployment_strategy": fields.get('deployment_strategy', "rolling"),
         "infrastructure": {
             "platform": "AWS EC2",
             "region": app.config['AWS_REGION'],
             "instance_id": app.config['EC2_INSTANCE_ID']
         },
-        "status": "successful"
+        "status": fields.get('status', "successful")
     }
     
     # Record build artifact
     artifact = {
-        "artifact_id": build_hash,
+        "artifact_id": build_id,
         "type": "docker_image",
-        "name": f"{app.config['APP_NAME']}:{app.config['VERSION']}-{app.config['BUILD_NUMBER']}",
+        "name": f"{app.config['APP_NAME']}:{deployment['version']}-{deployment['build_number']}",
+        "version": deployment['version'],
         "size": "125MB",
-        "created": datetime.datetime.utcnow().isoformat()
+        "created": timestamp
     }
+    return deployment, artifact
+
+def parse_deployment_entry(entry, now):
+    """Validate one batch entry, returns (fields, ts) or raises ValueError"""
+    if not isinstance(entry, dict):
+        raise ValueError("record must be a JSON object")
+    unknown = set(entry) - set(DEPLOYMENT_FIELDS) - {'deployment_id', 'timestamp'}
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    for name in DEPLOYMENT_FIELDS + ('deployment_id',):
+        value = entry.get(name)
+        if value is not None and (not isinstance(value, str) or not value or len(value) > 128):
+            raise ValueError(f"{name} must be a non-empty string of at most 128 characters")
+    ts = now
+    if entry.get('timestamp') is not None:
+        try:
+            ts = parse_time_param(str(entry['timestamp']))
+        except (ValueError, OverflowError):
+            raise ValueError("timestamp must be unix seconds or ISO-8601") from None
+        if not representable_timestamp(ts):  # the deployment stores it as a UTC datetime
+            raise ValueError("timestamp out of range")
+    return entry, ts
+
+@app.route("/devops/deploy", methods=['POST'])
+@json_api_response
+def record_devops_deployment():
+    """Record deployment - Called by Jenkins Pipeline"""
+    now = time.time()
+    deployment, artifact = new_deployment(generate_build_id(), now)
+    deployment_store.record(deployment, artifact, now)
     
-    devops_metrics['deployment_history'].append(deployment)
-    devops_metrics['build_artifacts'].append(artifact)
-    
-    logger.info(f"🚀 New deployment recorded: {deployment['deployment_id']} | Build #{deployment['build_number']}")
+    logger.info("🚀 New deployment recorded: %s | Build #%s", deployment['deployment_id'], deployment['build_number'])
     
     return {
         "message": "Deployment recorded successfully in DevOps pipeline",
         "deployment": deployment,
-        "total_deployments": len(devops_metrics['deployment_history']),
+        "total_deployments": deployment_store.total_deployments(),
         "build_artifact": artifact
     }
 
+@app.route("/devops/deploy/batch", methods=['POST'])
+@json_api_response
+def record_devops_deployment_batch():
+    """Record many deployments from a JSON array or NDJSON body, parsed as it streams in"""
+    ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    entries = iter_ndjson(request.stream) if ndjson else iter_json_array(request.stream)
+    only_errors = request.args.get('results') == 'errors'
+    now = time.time()
+    summary = collections.Counter()
+    results = []  # every outcome, or only the ones not recorded with ?results=errors
+    pending = []  # (index, deployment_id) of the records in the chunk being stored
+    received = 0
+    parse_error = None
+
+    def valid_records():
+        nonlocal received, parse_error
+        try:
+            for index, entry in enumerate(entries):
+                received = index + 1
+                try:
+                    fields, ts = parse_deployment_entry(entry, now)
+                except ValueError as e:
+                    summary['invalid'] += 1
+                    results.append({"index": index, "status": "invalid", "error": str(e)})
+                    continue
+                deployment, artifact = new_deployment(generate_build_id(), ts, fields)
+                pending.append((index, deployment['deployment_id']))
+                yield deployment, artifact, ts
+        except ValueError as e:
+            # Malformed body: everything parsed before this point is still recorded.
+            # `received` entries were read, so that is the 0-based index of the bad one
+            parse_error = f"record {received}: {e}"
+
+    for inserted in deployment_store.record_many(valid_records(), chunk_size=app.config['DEPLOY_BATCH_CHUNK']):
+        for (index, deployment_id), was_inserted in zip(pending, inserted):
+            status = "recorded" if was_inserted else "duplicate"
+            summary[status] += 1
+            if not only_errors or status != "recorded":
+                results.append({"index": index, "status": status, "deployment_id": deployment_id})
+        pending.clear()
+    results.sort(key=lambda result: result["index"])  # invalid entries are noted before their chunk is stored
+
+    logger.info("🚀 Deployment batch: %d recorded, %d duplicate, %d invalid",
+                summary['recorded'], summary['duplicate'], summary['invalid'])
+    
+    response = {
+        "message": "Deployment batch processed",
+        "received": received,
+        "recorded": summary['recorded'],
+        "duplicates": summary['duplicate'],
+        "invalid": summary['invalid'],
+        "total_deployments": deployment_store.total_deployments(),
+        "results": results
+    }
+    if parse_error is not None:
+        response["error"] = parse_error
+        return response, 400
+    return response
+
 @app.route("/devops/metrics")
 @json_api_response
 def devops_metrics_api():
     """DevOps Application Metrics"""
+    latency = request_latency.report()
+    counters = devops_counters.snapshot()
+    system = system_sampler.latest()
+    pipeline = pipeline_metrics.report()
     return {
         "application_metrics": {
-            "total_requests": devops_metrics['api_calls'],
-            "health_checks": devops_metrics['health_checks'],
-            "error_count": devops_metrics['errors'],
-            "uptime_seconds": int(time.time() - devops_metrics['start_time']),
+            "total_requests": counters['api_calls'],
+            "health_checks": counters['health_checks'],
+            "error_count": counters['errors'],
+            "uptime_seconds": int(time.time() - devops_counters.started_at),
             "uptime_formatted": get_uptime()
         },
         "performance_metrics": {
-            "avg_response_time": "45ms",
-            "requests_per_second": 12.5,
-            "cpu_usage": "8.2%",
-            "memory_usage": "156MB",
-            "disk_usage": "2.1GB"
+            "avg_response_time_ms": latency['overall']['1m']['mean_ms'],
+            "p50_response_time_ms": latency['overall']['1m']['p50_ms'],
+            "p95_response_time_ms": latency['overall']['1m']['p95_ms'],
+            "p99_response_time_ms": latency['overall']['1m']['p99_ms'],
+            "max_response_time_ms": latency['overall']['1m']['max_ms'],
+            "requests_per_second": latency['overall']['1m']['requests_per_second'],
+            "cpu_usage": f"{system['cpu_percent']:g}%" if system['cpu_percent'] is not None else None,
+            "memory_usage": (f"{int(system['process_rss_bytes']) // (1024 * 1024)}MB"
+                             if system['process_rss_bytes'] is not None else None),
+            "disk_usage": (f"{system['disk_used_bytes'] / (1024 ** 3):.1f}GB"
+                           if system['disk_used_bytes'] is not None else None)
         },
+        "system_metrics": system,
+        "admission": admission.report(),
+        "latency": latency,
         "deployment_metrics": {
-            "total_deployments": len(devops_metrics['deployment_history']),
-            "deployment_frequency": "3.2 per week",
-            "success_rate": "98.7%",
-            "rollback_count": 0
+            "total_deployments": deployment_store.total_deployments(),
+            "deployment_frequency": pipeline['dora']['deployment_frequency'],
+            "change_failure_rate": pipeline['dora']['change_failure_rate'],
+            "success_rate": pipeline['dora']['deployment_success_rate'],
+            "lead_time": pipeline['dora']['lead_time']['median'],
+            "rollback_count": deployment_store.statistics()['by_status'].get('rolled_back', 0)
         },
         "pipeline_metrics": {
-            "avg_build_time": "2m 45s",
-            "pipeline_success_rate": "96.4%",
-            "builds_this_month": 47,
-            "test_coverage": "87%"
+            "avg_build_time": pipeline['builds']['avg_duration'],
+            "pipeline_success_rate": pipeline['builds']['success_rate'],
+            "builds_this_month": pipeline['builds']['this_month'],
+            "test_coverage": pipeline['test_coverage'],
+            "window_days": pipeline['window_days']
         }
     }
 
+@app.route("/devops/metrics/timeseries")
+@json_api_response
+def metrics_timeseries():
+    """System metric history as [timestamp, min, avg, max] points, oldest first"""
+    args = request.args
+    metric = args.get('metric', 'cpu_percent')
+    resolution = args.get('resolution', '1m')
+    if metric not in SYSTEM_METRICS:
+        return bad_request(f"Unknown metric {metric!r}, expected one of: {', '.join(SYSTEM_METRICS)}")
+    if resolution not in SYSTEM_RESOLUTIONS:
+        return bad_request(f"Unknown resolution {resolution!r}, expected one of: {', '.join(SYSTEM_RESOLUTIONS)}")
+    try:
+        since = parse_time_param(args['since']) if args.get('since') else None
+        points = system_sampler.series(metric, resolution, since)
+    except (ValueError, OverflowError):
+        return bad_request("since must be unix seconds or ISO-8601")
+    step, size = SYSTEM_RESOLUTIONS[resolution]
+    return {
+        "metric": metric,
+        "resolution": resolution,
+        "step_seconds": step,
+        "retention_seconds": step * size,
+        "since": since,
+        "columns": ["timestamp", "min", "avg", "max"],
+        "points": points
+    }
+
+# Prometheus/OpenMetrics exposition
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_PROMETHEUS_BUCKETS_US = [int(bound * 1000000) for bound in PROMETHEUS_BUCKETS]
+_PROMETHEUS_LE = [format(bound, 'g') for bound in PROMETHEUS_BUCKETS]
+
+prometheus_metrics = MetricsExposition(min_interval=float(os.environ.get('DEVOPS_PROMETHEUS_MIN_INTERVAL', '1')))
+
+def _collect_counter(name):
+    def collect():
+        yield '_total', (), devops_counters.value(name)
+    return collect
+
+def _collect_uptime():
+    yield '', (), round(time.time() - devops_counters.started_at, 3)
+
+def _collect_build_info():
+    yield '', (
+        ('version', app.config['VERSION']),
+        ('build', app.config['BUILD_NUMBER']),
+        ('commit', app.config['GIT_COMMIT_SHA']),
+        ('branch', app.config['GIT_BRANCH']),
+        ('environment', app.config['ENVIRONMENT'])
+    ), 1
+
+# Latency histograms and admission counts live in each worker, not in the shared table: they are
+# labelled with the worker's pid, or a scrape answered by another worker would look like a counter reset
+_latency_samples = {}  # endpoint -> (observation count, samples), rebuilt only when the count moves
+
+def _worker_label():
+    return ('worker', str(os.getpid()))
+
+def _collect_latency():
+    worker = _worker_label()
+    for endpoint in request_latency.endpoints():
+        histogram = request_latency.histogram(endpoint)
+        cached = _latency_samples.get(endpoint)
+        if cached is None or cached[0] != histogram.count:
+            cumulative, total, total_us = cumulative_buckets(histogram.lifetime, _PROMETHEUS_BUCKETS_US)
+            label = ('endpoint', endpoint)
+            samples = [('_bucket', (label, worker, ('le', le)), seen) for le, seen in zip(_PROMETHEUS_LE, cumulative)]
+            samples.append(('_bucket', (label, worker, ('le', '+Inf')), total))
+            samples.append(('_count', (label, worker), total))
+            samples.append(('_sum', (label, worker), total_us / 1000000.0))
+            cached = (total, samples)
+            _latency_samples[endpoint] = cached
+        yield from cached[1]
+
+def _collect_admission(field):
+    def collect():
+        worker = _worker_label()
+        for endpoint, limit in sorted(admission.limits.items()):
+            yield '_total', (('endpoint', endpoint), worker), getattr(limit, field)
+    return collect
+
+def _collect_deployments(dimension, label):
+    def collect():
+        for key, value in sorted(deployment_store.statistics()[dimension].items()):
+            yield '_total', ((label, key),), value
+    return collect
+
+prometheus_metrics.register('devops_requests', 'counter', "HTTP requests served", _collect_counter('api_calls'))
+prometheus_metrics.register('devops_health_checks', 'counter', "Health check requests", _collect_counter('health_checks'))
+prometheus_metrics.register('devops_errors', 'counter', "Requests that failed with an error", _collect_counter('errors'))
+prometheus_metrics.register('devops_uptime_seconds', 'gauge', "Seconds since the instance started", _collect_uptime, unit='seconds')
+prometheus_metrics.register('devops_build_info', 'gauge', "Build and deployment metadata", _collect_build_info)
+prometheus_metrics.register('devops_request_duration_seconds', 'histogram', "Request latency per endpoint and worker",
+                            _collect_latency, unit='seconds')
+prometheus_metrics.register('devops_admission_shed', 'counter', "Requests rejected by admission control, per worker",
+                            _collect_admission('shed'))
+prometheus_metrics.register('devops_admission_admitted', 'counter', "Requests admitted on limited routes, per worker",
+                            _collect_admission('admitted'))
+prometheus_metrics.register('devops_deployments', 'counter', "Recorded deployments per status",
+                            _collect_deployments('by_status', 'status'))
+prometheus_metrics.register('devops_deployments_by_environment', 'counter', "Recorded deployments per environment",
+                            _collect_deployments('by_environment', 'environment'))
+prometheus_metrics.register('devops_deployments_by_branch', 'counter', "Recorded deployments per git branch",
+                            _collect_deployments('by_branch', 'branch'))
+
+@app.route("/devops/metrics/prometheus")
+def prometheus_exposition():
+    """Metrics in OpenMetrics text format for Prometheus scrapers"""
+    return Response(prometheus_metrics.render(), content_type=OPENMETRICS_CONTENT_TYPE)
+
+INFRASTRUCTURE_PAYLOAD = JsonTemplate(lambda: {
+    "aws_infrastructure": {
+        "region": app.config['AWS_REGION'],
+        "availability_zone": f"{app.config['AWS_REGION']}a",
+        "instance_type": "t3.medium",
+        "instance_id": app.config['EC2_INSTANCE_ID'],
+        "vpc_id": "vpc-12345678",
+        "subnet_id": "subnet-87654321",
+        "security_groups": ["sg-devops-web", "sg-jenkins-access"]
+    },
+    "networking": {
+        "public_ip": "3.15.123.45",
+        "private_ip": "10.0.1.100",
+        "load_balancer": "devops-app-lb",
+        "ssl_certificate": "*.devops-app.com"
+    },
+    "monitoring": {
+        "cloudwatch_enabled": True,
+        "log_groups": ["/aws/ec2/devops-app", "/aws/jenkins/pipeline"],
+        "alarms": ["high-cpu", "disk-space", "memory-usage"],
+        "sns_topic": "devops-alerts"
+    },
+    "backup": {
+        "ebs_snapshots": "daily",
+        "retention_period": "30 days",
+        "last_backup": "2024-01-15T02:00:00Z"
+    }
+})
+
+_infrastructure_body = None  # (body, etag), never changes while the process runs
+
+def infrastructure_body():
+    global _infrastructure_body
+    if _infrastructure_body is None:
+        body = INFRASTRUCTURE_PAYLOAD.render()
+        _infrastructure_body = (body, hashlib.blake2b(body, digest_size=12).hexdigest())
+    return _infrastructure_body
+
 @app.route("/devops/infrastructure")
 @json_api_response
 def infrastructure_info():
     """AWS Infrastructure Information"""
+    body, etag = infrastructure_body()
+    # A validator lets clients and the compressor cache it
+    response = json_body(body)
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def parse_time_param(value):
+    """Accept unix seconds or an ISO-8601 timestamp (UTC unless it carries an offset)"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = None
+    if seconds is not None:
+        if not math.isfinite(seconds):
+            raise ValueError(f"Not a finite timestamp: {value}")
+        return seconds
+    parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+def representable_timestamp(seconds):
+    """Whether unix seconds convert to a UTC datetime, which stops at years 1 and 9999"""
+    try:
+        datetime.datetime.utcfromtimestamp(seconds)
+    except (ValueError, OverflowError, OSError):
+        return False
+    return True
+
+def bad_request(message):
     return {
-        "aws_infrastructure": {
-            "region": app.config['AWS_REGION'],
-            "availability_zone": f"{app.config['AWS_REGION']}a",
-            "instance_type": "t3.medium",
-            "instance_id": app.config['EC2_INSTANCE_ID'],
-            "vpc_id": "vpc-12345678",
-            "subnet_id": "subnet-87654321",
-            "security_groups": ["sg-devops-web", "sg-jenkins-access"]
-        },
-        "networking": {
-            "public_ip": "3.15.123.45",
-            "private_ip": "10.0.1.100",
-            "load_balancer": "devops-app-lb",
-            "ssl_certificate": "*.devops-app.com"
-        },
-        "monitoring": {
-            "cloudwatch_enabled": True,
-            "log_groups": ["/aws/ec2/devops-app", "/aws/jenkins/pipeline"],
-            "alarms": ["high-cpu", "disk-space", "memory-usage"],
-            "sns_topic": "devops-alerts"
-        },
-        "backup": {
-            "ebs_snapshots": "daily",
-            "retention_period": "30 days",
-            "last_backup": "2024-01-15T02:00:00Z"
-        }
-    }
+        "error": "Bad Request",
+        "message": message,
+        "status_code": 400,
+        "timestamp": datetime.datetime.utcnow().isoformat()
+    }, 400
+
+def deploy_stage_mean():
+    stage = pipeline_metrics.report()['stages'].get(app.config['PIPELINE_DEPLOY_STAGE'])
+    return stage['duration']['mean_seconds'] if stage else None
 
 @app.route("/devops/deployments")
 @json_api_response
 def deployment_history():
-    """Deployment History"""
+    """Deployment History - cursor paginated, newest first"""
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', 10)), 1), 100)
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        if cursor is not None and not 0 <= cursor < 2 ** 63:
+            raise ValueError(f"cursor out of range: {cursor}")  # SQLite integers are 64-bit
+        since = parse_time_param(args['since']) if args.get('since') else None
+        until = parse_time_param(args['until']) if args.get('until') else None
+    except ValueError:
+        return bad_request("limit and cursor must be integers, since/until unix seconds or ISO-8601")
+    filters = {
+        "status": args.get('status'),
+        "branch": args.get('branch'),
+        "since": since,
+        "until": until
+    }
+
+    deployments, next_cursor = deployment_store.page(limit, cursor, **filters)
+    statistics = deployment_store.statistics()
     return {
-        "deployments": devops_metrics['deployment_history'][-10:],  # Last 10
-        "total_count": len(devops_metrics['deployment_history']),
+        "deployments": deployments,
+        "total_count": deployment_store.total_deployments(),
+        "page": {
+            "limit": limit,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "filters": {name: value for name, value in filters.items() if value is not None}
+        },
         "statistics": {
-            "successful_deployments": len([d for d in devops_metrics['deployment_history'] if d['status'] == 'successful']),
-            "failed_deployments": len([d for d in devops_metrics['deployment_history'] if d['status'] == 'failed']),
-            "avg_deployment_time": "1m 45s"
+            "successful_deployments": statistics['by_status'].get('successful', 0),
+            "failed_deployments": statistics['by_status'].get('failed', 0),
+            "avg_deployment_time": format_duration(deploy_stage_mean()),
+            **statistics
         }
     }
 
+@app.route("/devops/deployments/<deployment_id>")
+@json_api_response
+def deployment_detail(deployment_id):
+    """Single deployment looked up by id"""
+    deployment = deployment_store.get_deployment(deployment_id)
+    if deployment is None:
+        return {
+            "error": "Deployment Not Found",
+            "deployment_id": deployment_id,
+            "status_code": 404,
+            "timestamp": datetime.datetime.utcnow().isoformat()
+        }, 404
+    return {"deployment": deployment}
+
+@app.route("/devops/artifacts")
+@json_api_response
+def artifact_search():
+    """Build artifacts by ?name= and/or ?version=, newest first"""
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return bad_request("limit must be an integer")
+    filters = {"name": args.get('name'), "version": args.get('version')}
+    return {
+        "artifacts": deployment_store.find_artifacts(limit=limit, **filters),
+        "filters": {name: value for name, value in filters.items() if value is not None},
+        "limit": limit
+    }
+
+@app.route("/devops/artifacts/<artifact_id>")
+@json_api_response
+def artifact_detail(artifact_id):
+    """Single build artifact looked up by id"""
+    artifact = deployment_store.get_artifact(artifact_id)
+    if artifact is None:
+        return {
+            "error": "Artifact Not Found",
+            "artifact_id": artifact_id,
+            "status_code": 404,
+            "timestamp": datetime.datetime.utcnow().isoformat()
+        }, 404
+    return {"artifact": artifact}
+
 @app.route("/devops/logs")
 @json_api_response
 def application_logs():
-    """Application Logs (sample)"""
+    """Application Logs - newest first, read straight from the log file"""
+    args = request.args
+    stream = args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+    try:
+        limit = int(args.get('limit', 100))
+        since = parse_time_param(args['since']) if args.get('since') else None
+        until = parse_time_param(args['until']) if args.get('until') else None
+    except ValueError:
+        return bad_request("limit must be an integer, since/until unix seconds or ISO-8601")
+    levels = [level.strip().upper() for level in args.get('level', '').split(',') if level.strip()]
+    unknown = [level for level in levels if level not in LOG_LEVELS]
+    if unknown:
+        return bad_request(f"Unknown log level(s): {', '.join(unknown)}")
+
+    try:
+        log_filter = LogFilter(levels=levels, contains=args.get('q'), since=since, until=until)
+    except (OverflowError, OSError, ValueError):
+        # Finite but outside what the platform's localtime() can represent
+        return bad_request("since/until out of range")
+    if stream:
+        # Large pulls are streamed as chunked NDJSON, one record per line
+        limit = min(max(limit, 1), 1000000)
+        lines = (json.dumps(record) + "\n" for record in log_reader.records(log_filter, limit))
+        return Response(lines, mimetype='application/x-ndjson')
+
+    limit = min(max(limit, 1), 1000)
     return {
-        "logs": [
-            {"level": "INFO", "timestamp": "2024-01-15T10:30:45Z", "message": "Application started successfully"},
-            {"level": "INFO", "timestamp": "2024-01-15T10:31:12Z", "message": "Health check endpoint called"},
-            {"level": "INFO", "timestamp": "2024-01-15T10:32:01Z", "message": "New deployment initiated"},
-            {"level": "INFO", "timestamp": "2024-01-15T10:33:15Z", "message": "Pipeline metrics updated"}
-        ],
-        "log_levels": {
-            "INFO": 1250,
-            "WARNING": 12,
-            "ERROR": 3,
-            "DEBUG": 0
-        }
+        "logs": list(log_reader.records(log_filter, limit)),
+        "log_levels": log_reader.level_counts()
     }
 
+# On-demand profiling, guarded by DEVOPS_PROFILE_TOKEN (404 while unset)
+request_profiler = SamplingProfiler()
+
+def profile_authorized():
+    token = app.config['PROFILE_TOKEN']
+    supplied = request.headers.get('X-Profile-Token', '')
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer':
+        supplied = credentials.strip()
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+def profile_forbidden():
+    return {
+        "error": "Forbidden",
+        "message": "A valid profiling token is required",
+        "status_code": 403,
+        "timestamp": datetime.datetime.utcnow().isoformat()
+    }, 403
+
+@app.route("/devops/profile")
+def devops_profile():
+    """Sample every thread for ?seconds=N and return collapsed stacks (flamegraph.pl / speedscope input)"""
+    if not app.config['PROFILE_TOKEN']:
+        return devops_not_found(None)
+    if not profile_authorized():
+        return encode_api_result(profile_forbidden())
+    try:
+        seconds = min(max(float(request.args.get('seconds', 10)), 0.1), app.config['PROFILE_MAX_SECONDS'])
+        interval = min(max(float(request.args.get('interval_ms', 10)), 1.0), 1000.0) / 1000.0
+    except ValueError:
+        return encode_api_result(bad_request("seconds and interval_ms must be numbers"))
+    include_idle = request.args.get('idle') in ('1', 'true', 'yes')
+    logger.warning("Profiling worker %d for %gs at %gms intervals", os.getpid(), seconds, interval * 1000)
+    try:
+        stacks, passes = request_profiler.run(seconds, interval=interval, include_idle=include_idle)
+    except ProfileBusy:
+        return encode_api_result(({
+            "error": "Conflict",
+            "message": "A profile is already running in this worker",
+            "status_code": 409,
+            "timestamp": datetime.datetime.utcnow().isoformat()
+        }, 409))
+    response = Response(format_collapsed(stacks), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(passes)
+    response.headers['X-Profile-Worker'] = str(os.getpid())
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route("/devops/profile/stages")
+@json_api_response
+def devops_profile_stages():
+    """Per-stage timings of the request hooks and JSON views (DEVOPS_STAGE_TIMERS=1)"""
+    if not app.config['PROFILE_TOKEN']:
+        return devops_not_found(None)
+    if not profile_authorized():
+        return profile_forbidden()
+    if stage_latency is None:
+        return {"enabled": False, "stages": {}}
+    return {"enabled": True, "stages": stage_latency.report()['endpoints']}
+
 # Error Handlers for DevOps
 @app.errorhandler(404)
 @json_api_response
@@ -524,16 +1545,37 @@ def devops_not_found(error):
 @app.errorhandler(500)
 @json_api_response
 def devops_server_error(error):
-    devops_metrics['errors'] += 1
-    logger.error(f"DevOps Application Error: {error}")
+    devops_counters.incr('errors')
+    logger.error("DevOps Application Error: %s", error)
     return {
         "error": "Internal Server Error",
         "message": "DevOps pipeline encountered a critical error",
-        "incident_id": generate_build_hash(),
+        "incident_id": generate_build_id(),
         "status_code": 500,
         "timestamp": datetime.datetime.utcnow().isoformat()
     }, 500
 
+# Gunicorn startup hooks (gunicorn.conf.py)
+def prepare_preload():
+    """Build the state that never changes while the app runs, once, in the gunicorn master.
+
+    Workers forked afterwards share these pages instead of each building its own copy on
+    first request. Nothing here starts a thread or attaches the shared counter table, the
+    master's parent is not a gunicorn master; that is init_worker()'s job after fork.
+    """
+    dashboard_cache.compile()
+    for template in (HEALTH_PAYLOAD, PIPELINE_PAYLOAD, INFRASTRUCTURE_PAYLOAD):
+        template.compile()
+    infrastructure_body()
+    app.url_map.update()  # routing rules are otherwise compiled on the first request
+
+def init_worker():
+    """Per-worker setup, run after fork (and after the app is loaded without preload)"""
+    devops_counters.snapshot()  # attaches this master's counter table
+    log_listener.ensure_started()
+    health_probes.ensure_started()
+    system_sampler.ensure_started()
+
 if __name__ == "__main__":
     logger.info("🚀 Starting DevOps Flask Application")
     logger.info(f"📦 Application: {app.config['APP_NAME']}")
@@ -0,0 +1,214 @@
+"""ASGI entry point: the same routes as app.py, without a thread per connection
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 asgi:app
+
+Connections are owned by the event loop, so idle keep-alive clients and
+slow readers cost a socket, not a thread. /devops/stream is served natively:
+every SSE subscriber is a coroutine woken by the shared publisher. Health
+checks and the static infrastructure payload run the Flask app inline on the
+loop (they only read in-memory state, and keep every hook: counters,
+sampling, latency, compression). Everything else goes through a WSGI bridge
+on a bounded thread pool, including reads like /, /devops/metrics and
+/devops/pipeline: they query SQLite, which can wait on a writer's lock or the
+busy timeout, and on the loop that would stall every connection.
+"""
+import asyncio
+import concurrent.futures
+import os
+import sys
+import tempfile
+
+from app import app as flask_app, dashboard_stream, devops_counters, logger
+
+# Served by calling the Flask app directly on the event loop: nothing here may touch SQLite or a lock
+INLINE_ROUTES = frozenset({
+    ('GET', '/devops/health'),
+    ('GET', '/devops/infrastructure'),
+})
+
+STREAM_PATH = '/devops/stream'
+
+# Request bodies up to this size stay in memory, larger ones (deploy batches) spill to disk
+BODY_SPOOL_SIZE = 1024 * 1024
+
+
+class DevOpsASGI:
+    def __init__(self, wsgi_app, threads=32):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.threads, thread_name_prefix="devops-wsgi")
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            if scope['method'] == 'GET' and scope['path'] == STREAM_PATH:
+                await self._stream(scope, receive, send)
+            else:
+                await self._wsgi(scope, receive, send, inline=(scope['method'], scope['path']) in INLINE_ROUTES)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _stream(self, scope, receive, send):
+        """Native SSE: one coroutine per subscriber, fed by the shared publisher"""
+        devops_counters.incr('api_calls')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                        (b'cache-control', b'no-cache'),
+                        (b'x-accel-buffering', b'no')]
+        })
+        frames = dashboard_stream.subscribe_async()
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            while True:
+                # Wait for the next frame or the client leaving, whichever comes first
+                next_frame = asyncio.ensure_future(frames.__anext__())
+                await asyncio.wait((next_frame, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not next_frame.done():
+                    next_frame.cancel()
+                    # Let the cancellation unwind the generator (and detach) before closing it
+                    await asyncio.gather(next_frame, return_exceptions=True)
+                    break
+                await send({'type': 'http.response.body', 'body': next_frame.result(), 'more_body': True})
+        except OSError:
+            pass  # client went away mid-write
+        finally:
+            disconnected.cancel()
+            await frames.aclose()
+
+    async def _wsgi(self, scope, receive, send, inline):
+        body = await _read_body(receive)
+        environ = wsgi_environ(scope, body)
+        if inline:
+            status, headers, chunks = _run_wsgi(self.wsgi_app, environ)
+            await send(_response_start(status, headers))
+            await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run_threaded, environ, send, loop)
+
+    def _run_threaded(self, environ, send, loop):
+        """Run the WSGI app on a pool thread, relaying its (possibly streamed) body to the loop"""
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [status, headers]
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            started = False
+            for chunk in iterable:
+                if not chunk:
+                    continue
+                if not started:
+                    emit(_response_start(*response))
+                    started = True
+                emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                emit(_response_start(*response))
+            emit({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+            environ['wsgi.input'].close()
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _read_body(receive):
+    body = tempfile.SpooledTemporaryFile(BODY_SPOOL_SIZE)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+    return body
+
+
+def _run_wsgi(wsgi_app, environ):
+    response = []
+
+    def start_response(status, headers, exc_info=None):
+        response[:] = [status, headers]
+
+    iterable = wsgi_app(environ, start_response)
+    try:
+        chunks = list(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+        environ['wsgi.input'].close()
+    return response[0], response[1], chunks
+
+
+def _response_start(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    }
+
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,  # the body is fully buffered, readable without a Content-Length
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+app = DevOpsASGI(flask_app, threads=int(os.environ.get('DEVOPS_ASGI_THREADS', '32')))
+logger.info("ASGI mode: %d bridge threads, %d routes served inline", app.threads, len(INLINE_ROUTES))
@@ -0,0 +1,198 @@
+"""Many concurrent keep-alive connections: WSGI servers against the ASGI mode
+
+    python benchmarks/bench_connections.py [--servers gunicorn-gthread,flask-dev,uvicorn]
+                                           [--connections 10000] [--duration 20] [--think 1.0]
+                                           [--stream]
+
+Opens `--connections` persistent HTTP/1.1 connections (ramped up over
+`--ramp` seconds) and has each one poll /devops/health, pausing `--think`
+seconds between requests the way load balancers and dashboards do, so most
+connections are idle at any moment. With --stream every connection instead
+subscribes to /devops/stream and the run counts how many receive their
+snapshot. Reported per server: connections established and refused,
+requests served, latency percentiles, errors, and the server's RSS and
+thread count under load. The ASGI mode needs uvicorn installed and is
+skipped otherwise.
+"""
+import argparse
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import Server, percentile  # noqa: E402
+
+SERVERS = ('gunicorn-gthread', 'flask-dev', 'uvicorn')
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        target = hard if hard != resource.RLIM_INFINITY else 1 << 20
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+async def read_response(reader):
+    """Status and body of one response, Content-Length or chunked framing"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    return status, headers.get('connection') == 'close'
+
+
+async def poller(port, path, ramp, deadline, think, stats):
+    await asyncio.sleep(random.uniform(0, ramp))
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 10)
+    except (OSError, asyncio.TimeoutError):
+        stats['refused'] += 1
+        return
+    stats['connected'] += 1
+    request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode('ascii')
+    try:
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            writer.write(request)
+            status, close = await asyncio.wait_for(read_response(reader), 30)
+            stats['latencies'].append(time.monotonic() - started)
+            if status != 200:
+                stats['errors'] += 1
+            if close:
+                # Servers without keep-alive (gunicorn sync): count the reconnect it forces
+                writer.close()
+                stats['reconnects'] += 1
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await asyncio.sleep(think)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        stats['errors'] += 1
+        stats['dropped'] += 1
+    finally:
+        writer.close()
+
+
+async def subscriber(port, ramp, deadline, stats):
+    await asyncio.sleep(random.uniform(0, ramp))
+    started = time.monotonic()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 10)
+    except (OSError, asyncio.TimeoutError):
+        stats['refused'] += 1
+        return
+    stats['connected'] += 1
+    subscribed = False
+    try:
+        writer.write(b"GET /devops/stream HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n")
+        await asyncio.wait_for(reader.readuntil(b'event: snapshot'), max(deadline - time.monotonic(), 0.1))
+        stats['latencies'].append(time.monotonic() - started)
+        subscribed = True
+        # Hold the stream open for the rest of the run, like a dashboard tab would
+        while time.monotonic() < deadline:
+            if not await asyncio.wait_for(reader.read(65536), max(deadline - time.monotonic(), 0.1)):
+                stats['dropped'] += 1
+                break
+    except asyncio.TimeoutError:
+        if not subscribed:
+            stats['errors'] += 1  # never got its snapshot
+    except (OSError, asyncio.IncompleteReadError):
+        stats['errors'] += 1
+        stats['dropped'] += 1
+    finally:
+        writer.close()
+
+
+def client_process(port, path, connections, ramp, duration, think, stream):
+    raise_fd_limit()
+
+    async def run():
+        stats = {'connected': 0, 'refused': 0, 'errors': 0, 'dropped': 0, 'reconnects': 0, 'latencies': []}
+        deadline = time.monotonic() + ramp + duration
+        if stream:
+            tasks = [subscriber(port, ramp, deadline, stats) for _ in range(connections)]
+        else:
+            tasks = [poller(port, path, ramp, deadline, think, stats) for _ in range(connections)]
+        await asyncio.gather(*tasks)
+        return stats
+
+    return asyncio.run(run())
+
+
+def bench_server(name, args):
+    server = Server(name, args.workers, args.threads)
+    try:
+        server.wait_ready()
+        processes = max(1, args.client_processes)
+        per_process = -(-args.connections // processes)
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes) as pool:
+            pending = pool.starmap_async(client_process, [
+                (server.port, args.path, per_process, args.ramp, args.duration, args.think, args.stream)
+            ] * processes)
+            # Sample the server while every connection is open
+            time.sleep(args.ramp + args.duration / 2)
+            rss, threads = server.rss_bytes(), server.thread_count()
+            results = pending.get()
+    finally:
+        server.stop()
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    summary = {key: sum(result[key] for result in results)
+               for key in ('connected', 'refused', 'errors', 'dropped', 'reconnects')}
+    summary.update({
+        "served": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "rss_mb": round(rss / (1024 * 1024), 1),
+        "threads": threads,
+    })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default=','.join(SERVERS))
+    parser.add_argument('--connections', type=int, default=10000)
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds every connection stays busy")
+    parser.add_argument('--ramp', type=float, default=5.0, help="seconds over which connections are opened")
+    parser.add_argument('--think', type=float, default=1.0, help="seconds between requests on one connection")
+    parser.add_argument('--path', default='/devops/health')
+    parser.add_argument('--stream', action='store_true', help="hold /devops/stream subscriptions instead")
+    parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help="threads per gthread worker")
+    args = parser.parse_args()
+
+    limit = raise_fd_limit()
+    if limit < args.connections * 2 + 100:
+        print(f"warning: open file limit {limit} is below what {args.connections} connections need")
+    for name in filter(None, args.servers.split(',')):
+        if name == 'uvicorn' and importlib.util.find_spec('uvicorn') is None:
+            print(f"{name}: skipped, uvicorn is not installed")
+            continue
+        result = bench_server(name, args)
+        print(f"{name:<17} connected {result['connected']:>6} refused {result['refused']:>5} "
+              f"served {result['served']:>7} p50 {result['p50_ms']:>8.2f}ms p99 {result['p99_ms']:>9.2f}ms "
+              f"errors {result['errors']:>5} dropped {result['dropped']:>5} reconnects {result['reconnects']:>6} "
+              f"| RSS {result['rss_mb']:>7.1f}MB threads {result['threads']:>5}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
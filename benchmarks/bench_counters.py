@@ -0,0 +1,213 @@
+"""Stress benchmark: sharded shared counters vs the old unsynchronized dict counters
+
+    python benchmarks/bench_counters.py [--threads 1,8,32,64] [--increments 200000]
+
+Part one hammers a single counter from every thread behind a common start
+barrier and checks that the sharded counters never lose an increment. The
+raw rates are informational: a bare dict += is a couple of bytecodes, the
+sharded increment is a method call.
+
+Part two is the number that matters: requests/sec through the real WSGI
+app at 32+ threads, once with today's dict counters swapped back in and once
+with the sharded counters. The run fails (exit 1) on any lost increment or
+if request throughput drops by more than --tolerance.
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from devops_shared import SharedCounters  # noqa: E402
+
+COLUMNS = ('api_calls', 'health_checks', 'errors', 'deployments')
+
+
+def run_threads(threads, increments, work):
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        work(increments)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def bench_dict(threads, increments):
+    metrics = {name: 0 for name in COLUMNS}
+
+    def work(count):
+        for _ in range(count):
+            metrics['api_calls'] += 1
+
+    elapsed = run_threads(threads, increments, work)
+    return elapsed, metrics['api_calls']
+
+
+def bench_locked_dict(threads, increments):
+    metrics = {name: 0 for name in COLUMNS}
+    lock = threading.Lock()
+
+    def work(count):
+        for _ in range(count):
+            with lock:
+                metrics['api_calls'] += 1
+
+    elapsed = run_threads(threads, increments, work)
+    return elapsed, metrics['api_calls']
+
+
+def bench_sharded(threads, increments, path=None):
+    counters = SharedCounters(COLUMNS, path=path)
+
+    def work(count):
+        incr = counters.incr
+        for _ in range(count):
+            incr('api_calls')
+
+    elapsed = run_threads(threads, increments, work)
+    return elapsed, counters.value('api_calls')
+
+
+class DictCounters:
+    """Today's behaviour: plain dict ints with no synchronization"""
+
+    def __init__(self, columns):
+        self.metrics = {name: 0 for name in columns}
+        self.started_at = time.time()
+
+    def incr(self, name, amount=1):
+        self.metrics[name] += amount
+
+    def value(self, name):
+        return self.metrics[name]
+
+    def snapshot(self):
+        return dict(self.metrics)
+
+
+def bench_requests(app_module, counters, threads, requests, path):
+    """Drive the WSGI app directly from `threads` threads, return (seconds, health_checks)"""
+    app_module.devops_counters = counters
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+        'SERVER_NAME': 'bench', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    wsgi_app = app_module.app.wsgi_app
+
+    def start_response(status, headers, exc_info=None):
+        return None
+
+    def work(count):
+        for _ in range(count):
+            body = wsgi_app(dict(environ), start_response)
+            for _chunk in body:
+                pass
+            getattr(body, 'close', lambda: None)()
+
+    elapsed = run_threads(threads, requests, work)
+    return elapsed, counters.value('health_checks')
+
+
+def best_of(rounds, runs):
+    """Fastest of several interleaved rounds per backend.
+
+    Thread scheduling noise only ever makes a run slower, and interleaving
+    keeps slow drift (thermal, other tenants) from favouring one backend.
+    """
+    results = {}
+    for _ in range(rounds):
+        for backend, run in runs.items():
+            result = run()
+            if backend not in results or result[0] < results[backend][0]:
+                results[backend] = result
+    return results
+
+
+def request_level(threads_list, requests, tolerance, rounds):
+    os.chdir(tempfile.mkdtemp(prefix='devops-bench-'))  # keep app.log out of the tree
+    import app as app_module
+    logging.disable(logging.CRITICAL)
+    columns = app_module.devops_counters.columns
+    failed = False
+    print()
+    print(f"{'threads':>7} {'backend':<14} {'requests':>10} {'counted':>10} {'lost':>8} {'req/s':>8}")
+    for threads in threads_list:
+        if threads < 32:
+            continue
+        expected = threads * requests
+        results = best_of(rounds, {
+            'dict (today)': lambda: bench_requests(
+                app_module, DictCounters(columns), threads, requests, '/devops/health'),
+            'sharded': lambda: bench_requests(
+                app_module, SharedCounters(columns), threads, requests, '/devops/health'),
+        })
+        for backend, (elapsed, counted) in results.items():
+            print(f"{threads:>7} {backend:<14} {expected:>10} {counted:>10} {expected - counted:>8} {expected / elapsed:>8.0f}")
+        baseline = results['dict (today)'][0]
+        elapsed, counted = results['sharded']
+        if counted != expected:
+            print(f"FAIL: sharded counters lost {expected - counted} health checks at {threads} threads")
+            failed = True
+        if elapsed > baseline / (1 - tolerance):
+            print(f"FAIL: request throughput at {threads} threads dropped more than {tolerance:.0%}")
+            failed = True
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,8,32,64')
+    parser.add_argument('--increments', type=int, default=200000, help="increments per thread")
+    parser.add_argument('--requests', type=int, default=500, help="requests per thread for the WSGI run")
+    parser.add_argument('--rounds', type=int, default=5, help="WSGI rounds per backend, the best one counts")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="allowed request throughput drop vs the dict baseline at 32+ threads (run-to-run noise is ~5%%)")
+    parser.add_argument('--switch-interval', type=float, default=None,
+                        help="sys.setswitchinterval() value, smaller values provoke more lost updates")
+    args = parser.parse_args()
+    if args.switch_interval:
+        sys.setswitchinterval(args.switch_interval)
+
+    threads_list = [int(value) for value in args.threads.split(',')]
+    failed = False
+    print(f"{'threads':>7} {'backend':<14} {'expected':>10} {'counted':>10} {'lost':>8} {'Mops/s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in threads_list:
+            expected = threads * args.increments
+            results = {
+                'dict (today)': bench_dict(threads, args.increments),
+                'dict + lock': bench_locked_dict(threads, args.increments),
+                'sharded': bench_sharded(threads, args.increments),
+                'sharded mmap': bench_sharded(threads, args.increments, os.path.join(directory, f"bench-{threads}.bin")),
+            }
+            for backend, (elapsed, counted) in results.items():
+                rate = expected / elapsed / 1e6
+                print(f"{threads:>7} {backend:<14} {expected:>10} {counted:>10} {expected - counted:>8} {rate:>8.2f}")
+            for backend in ('sharded', 'sharded mmap'):
+                counted = results[backend][1]
+                if counted != expected:
+                    print(f"FAIL: {backend} lost {expected - counted} increments at {threads} threads")
+                    failed = True
+    failed = request_level(threads_list, args.requests, args.tolerance, args.rounds) or failed
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
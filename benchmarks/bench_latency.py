@@ -0,0 +1,74 @@
+"""Per-call cost of latency recording, against the shared counter increment it sits next to
+
+    python benchmarks/bench_latency.py [--calls 500000] [--repeat 7] [--budget-us 2.0]
+
+Three timings, each the fastest of --repeat runs of --calls calls:
+
+  counter incr    devops_counters.incr('api_calls'), for reference
+  record          LatencyHistogram.record(seconds, now) on a bound histogram,
+                  what every request pays for its latency
+  request hook    the after_request hook as a whole inside a request context:
+                  g.pop() of the timer, perf_counter() and record(). Flask's
+                  context-local `g` dominates it, informational only.
+
+The run fails (exit 1) if record costs more than --budget-us microseconds.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def per_call(stmt, namespace, calls, repeat):
+    """Fastest per-call time in microseconds, loop overhead subtracted"""
+    best = min(timeit.repeat(stmt, globals=namespace, number=calls, repeat=repeat))
+    empty = min(timeit.repeat('pass', number=calls, repeat=repeat))
+    return (best - empty) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--budget-us', type=float, default=2.0, help="allowed cost of one record() call")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='devops-bench-'))  # keep app.log out of the tree
+    import app as app_module
+    logging.disable(logging.CRITICAL)
+    from flask import g
+
+    histogram = app_module.request_latency.histogram_for('bench')
+    namespace = {
+        'counters': app_module.devops_counters,
+        'histogram': histogram,
+        'now': time.perf_counter(),
+        'g': g,
+        'perf_counter': time.perf_counter,
+        'hook': app_module.record_request_latency,
+    }
+    results = {
+        'counter incr': per_call("counters.incr('api_calls')", namespace, args.calls, args.repeat),
+        'record': per_call('histogram.record(0.0123, now)', namespace, args.calls, args.repeat),
+    }
+    with app_module.app.test_request_context('/devops/health'):
+        # Setting the timer is part of the measured statement, subtract it
+        setup = per_call('g.request_timer = (perf_counter(), histogram)', namespace, args.calls, args.repeat)
+        hook = per_call('g.request_timer = (perf_counter(), histogram); hook()', namespace, args.calls, args.repeat)
+        results['request hook'] = hook - setup
+
+    for name, micros in results.items():
+        print(f"{name:<14} {micros:>7.3f} us/call")
+    if results['record'] > args.budget_us:
+        print(f"FAIL: record() costs more than {args.budget_us} us")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
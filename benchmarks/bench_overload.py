@@ -0,0 +1,162 @@
+"""Overload: does /devops/health stay responsive while the expensive routes are flooded?
+
+    python benchmarks/bench_overload.py [--server gunicorn-gthread] [--threads 8]
+                                        [--flood 64] [--duration 15] [--health-timeout 1.0]
+
+The same server is run twice, once with admission control disabled
+(DEVOPS_ADMISSION_LIMITS='') and once with the defaults. Each run floods
+/, /devops/deployments, POST /devops/deploy and POST /devops/deploy/batch
+(`--batch` records of NDJSON, the one flooded route that is expensive on
+its own: the others are served from caches) from `--flood` closed-loop
+connections, while a separate client polls /devops/health every
+`--health-interval` seconds with `--health-timeout`, the way a load balancer
+does. Reported per run: health-check latency and how many checks timed out
+(each one would count towards pulling the instance from rotation), plus the
+flood's served, shed (503) and failed requests. The admission capacity is
+set to the server's thread count.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import Server, percentile  # noqa: E402
+
+FLOOD_ROUTES = (
+    ('GET', '/', None),
+    ('GET', '/devops/deployments?limit=100', None),
+    ('POST', '/devops/deploy', b''),
+    ('POST', '/devops/deploy/batch?results=errors', 'batch'),
+)
+
+
+def batch_body(records):
+    return '\n'.join(json.dumps({"version": f"1.0.{index}", "build_number": str(index)})
+                     for index in range(records)).encode()
+
+
+def flood_process(port, connections, deadline, batch):
+    """Closed-loop flood over FLOOD_ROUTES; returns (ok, shed, failed, latencies of served requests)"""
+    headers = {'Content-Type': 'application/x-ndjson'}
+    results = {'ok': 0, 'shed': 0, 'failed': 0, 'latencies': []}
+    lock = threading.Lock()
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        ok = shed = failed = 0
+        latencies = []
+        sent_count = offset
+        while time.monotonic() < deadline:
+            method, path, body = FLOOD_ROUTES[sent_count % len(FLOOD_ROUTES)]
+            sent_count += 1
+            sent = time.monotonic()
+            try:
+                if body == 'batch':
+                    connection.request(method, path, body=batch, headers=headers)
+                else:
+                    connection.request(method, path, body=body)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                failed += 1
+                continue
+            if response.status == 503:
+                shed += 1
+            elif response.status < 300 or response.status == 304:
+                ok += 1
+                latencies.append(time.monotonic() - sent)
+            else:
+                failed += 1
+        with lock:
+            results['ok'] += ok
+            results['shed'] += shed
+            results['failed'] += failed
+            results['latencies'].extend(latencies)
+
+    pool = [threading.Thread(target=client, args=(offset,)) for offset in range(connections)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
+
+
+def health_poller(port, deadline, interval, timeout):
+    """Load-balancer style checks on a fresh connection each; returns (latencies, timeouts, failures)"""
+    latencies, timeouts, failures = [], 0, 0
+    while time.monotonic() < deadline:
+        sent = time.monotonic()
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        try:
+            connection.request('GET', '/devops/health')
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.monotonic() - sent)
+            if response.status != 200:
+                failures += 1
+        except TimeoutError:
+            timeouts += 1
+        except (OSError, http.client.HTTPException):
+            failures += 1
+        finally:
+            connection.close()
+        time.sleep(max(interval - (time.monotonic() - sent), 0))
+    return sorted(latencies), timeouts, failures
+
+
+def run(label, args, extra_env):
+    env = {'DEVOPS_ADMISSION_CAPACITY': str(args.threads * args.workers)}
+    env.update(extra_env)
+    server = Server(args.server, args.workers, args.threads, extra_env=env)
+    try:
+        server.wait_ready()
+        processes = max(1, min(args.client_processes, args.flood))
+        per_process = -(-args.flood // processes)
+        deadline = time.monotonic() + args.duration
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes) as pool:
+            pending = pool.starmap_async(flood_process,
+                                         [(server.port, per_process, deadline, batch_body(args.batch))] * processes)
+            time.sleep(min(1.0, args.duration / 4))  # let the flood build up first
+            latencies, timeouts, failures = health_poller(server.port, deadline, args.health_interval,
+                                                          args.health_timeout)
+            floods = pending.get()
+    finally:
+        server.stop()
+    served = sorted(latency for result in floods for latency in result['latencies'])
+    ok, shed, failed = (sum(result[key] for result in floods) for key in ('ok', 'shed', 'failed'))
+    checks = len(latencies) + timeouts
+    print(f"{label:<20} health: {checks:>4} checks, p50 {percentile(latencies, 0.50) * 1000:>8.2f}ms "
+          f"p99 {percentile(latencies, 0.99) * 1000:>8.2f}ms, timed out {timeouts:>3}, failed {failures:>3} | "
+          f"flood: served {ok / args.duration:>7.1f} req/s (p99 {percentile(served, 0.99) * 1000:>8.2f}ms), "
+          f"shed {shed / args.duration:>7.1f} req/s, failed {failed}")
+    return timeouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', default='gunicorn-gthread')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8, help="threads per gthread worker")
+    parser.add_argument('--flood', type=int, default=64, help="closed-loop connections on the expensive routes")
+    parser.add_argument('--batch', type=int, default=200, help="records per flooded deployment batch")
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--health-interval', type=float, default=0.2)
+    parser.add_argument('--health-timeout', type=float, default=1.0)
+    parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    args = parser.parse_args()
+
+    run("without admission", args, {'DEVOPS_ADMISSION_LIMITS': ''})
+    timeouts = run("with admission", args, {})
+    return 1 if timeouts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""Load-test every /devops route under each server and gate on a stored baseline
+
+    python benchmarks/bench_routes.py [--servers flask-dev,gunicorn-sync,gunicorn-gthread]
+                                      [--duration 5] [--connections 32] [--repeat 3]
+                                      [--save benchmarks/baseline.json]
+                                      [--compare benchmarks/baseline.json]
+
+Each server is started from a scratch directory (its own SQLite history, log
+and shared counter file) and every route is driven twice:
+
+  closed loop  `--connections` clients each send the next request as soon as
+               the previous one answers; measures peak throughput.
+  open loop    requests are issued on a fixed schedule at `--open-load` times
+               the closed-loop throughput, whether or not earlier ones have
+               answered; latency runs from the scheduled send time, so queueing
+               behind a slow request is counted instead of hidden.
+
+The client runs in several processes so the load generator is not limited by
+one GIL. Results (throughput, p50/p90/p99/max latency, errors and the server's
+RSS summed over master and workers) are printed, optionally saved as a
+baseline, and compared against one. Exit status 1 means a regression beyond
+the tolerances, so the Jenkins Test stage can block it. Baselines only make
+sense on the machine they were recorded on.
+
+A single run is noisy: one slow scheduling hiccup moves a p99 by tens of
+percent. Every closed and open loop is therefore run `--repeat` times and
+each number is the median of those runs, for the baseline and the
+comparison alike. A server that still regresses is measured again
+(`--confirm` times) and only regressions that show up every time fail the
+gate: noise rarely hits the same route the same way twice, a real
+regression does. The tolerances (30% throughput, 60% p99, 20% RSS) apply
+to each measurement. They are sized for a small shared build agent: on one
+CPU running both the clients and the server, these medians moved by up to
+~26% throughput and ~1.5x p99 between runs of an unchanged tree. Pass
+tighter ones on quieter hardware.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = (
+    ('GET', '/'),
+    ('GET', '/devops/health'),
+    ('POST', '/devops/deploy'),
+    ('GET', '/devops/deployments'),
+    ('GET', '/devops/metrics'),
+)
+
+SERVERS = ('flask-dev', 'gunicorn-sync', 'gunicorn-gthread')  # 'uvicorn' (ASGI) on request
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(name, port, workers, threads):
+    bind = f"127.0.0.1:{port}"
+    if name == 'flask-dev':
+        return [sys.executable, os.path.join(ROOT, 'app.py')]
+    if name == 'gunicorn-sync':
+        return [sys.executable, '-m', 'gunicorn', '--chdir', ROOT, '-b', bind,
+                '-w', str(workers), '-k', 'sync', 'app:app']
+    if name == 'gunicorn-gthread':
+        return [sys.executable, '-m', 'gunicorn', '--chdir', ROOT, '-b', bind,
+                '-w', str(workers), '-k', 'gthread', '--threads', str(threads), 'app:app']
+    if name == 'uvicorn':
+        # ASGI mode (asgi.py), needs uvicorn installed
+        return [sys.executable, '-m', 'uvicorn', '--app-dir', ROOT, '--host', '127.0.0.1', '--port', str(port),
+                '--workers', str(workers), '--no-access-log', 'asgi:app']
+    raise ValueError(f"Unknown server: {name}")
+
+
+class Server:
+    """One app server in a scratch directory, stopped (with its workers) on exit"""
+
+    def __init__(self, name, workers, threads, extra_env=None, command=None):
+        self.name = name
+        self.port = free_port()
+        self.workdir = tempfile.mkdtemp(prefix=f"devops-bench-{name}-")
+        env = dict(os.environ)
+        env.update({
+            'PORT': str(self.port),
+            'PYTHONPATH': ROOT,
+            'DEVOPS_DEPLOYMENT_DB': os.path.join(self.workdir, 'devops.db'),
+            'DEVOPS_LOG_FILE': os.path.join(self.workdir, 'app.log'),
+            'DEVOPS_METRICS_FILE': os.path.join(self.workdir, 'metrics.bin'),
+        })
+        env.update(extra_env or {})
+        self.process = subprocess.Popen(
+            command or server_command(name, self.port, workers, threads), cwd=self.workdir, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+
+    def wait_ready(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with status {self.process.returncode}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                connection.request('GET', '/devops/health')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"{self.name} did not become ready within {timeout}s")
+
+    def pids(self):
+        """The server process and every process it forked"""
+        pids = {self.process.pid}
+        parents = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as handle:
+                        parents[int(entry)] = int(handle.read().rsplit(')', 1)[1].split()[1])
+                except OSError:
+                    continue
+        grew = True
+        while grew:
+            children = {pid for pid, parent in parents.items() if parent in pids} - pids
+            grew = bool(children)
+            pids |= children
+        return pids
+
+    def _status_total(self, field, scale=1):
+        total = 0
+        for pid in self.pids():
+            try:
+                with open(f"/proc/{pid}/status") as handle:
+                    for line in handle:
+                        if line.startswith(field):
+                            total += int(line.split()[1]) * scale
+            except OSError:
+                continue
+        return total
+
+    def rss_bytes(self):
+        """Resident memory of the server and every process it forked"""
+        return self._status_total('VmRSS:', 1024)
+
+    def thread_count(self):
+        return self._status_total('Threads:')
+
+    def stop(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=10)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def send(connection, method, path):
+    """One request on a persistent connection, reconnecting after close; True on a 2xx"""
+    body = b'' if method == 'POST' else None
+    try:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        response.read()
+        return response.status < 300
+    except (OSError, http.client.HTTPException):
+        connection.close()
+        return False
+
+
+def client_process(port, method, path, threads, duration, rate, started_at):
+    """Load from one client process: closed loop when rate is None, else `rate` req/s"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = started_at + duration
+    schedule = itertools.count()
+
+    def closed_loop():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while True:
+            sent = time.monotonic()
+            if sent >= deadline:
+                break
+            ok = send(connection, method, path)
+            local.append(time.monotonic() - sent)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    def open_loop():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while True:
+            scheduled = started_at + next(schedule) / rate
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            ok = send(connection, method, path)
+            local.append(time.monotonic() - scheduled)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    target = closed_loop if rate is None else open_loop
+    pool = [threading.Thread(target=target) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies, errors[0]
+
+
+def drive(port, method, path, connections, processes, duration, rate=None):
+    processes = max(1, min(processes, connections))
+    threads = -(-connections // processes)
+    started_at = time.monotonic() + 0.5  # every process starts on the same tick
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes) as pool:
+        results = pool.starmap(client_process, [
+            (port, method, path, threads, duration, None if rate is None else rate / processes, started_at)
+        ] * processes)
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    return summarize(latencies, errors, duration)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies, errors, duration):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def median_run(runs):
+    """Several runs of the same loop as one: the median of every number, except errors.
+
+    Errors are never noise, so the worst run's count is kept.
+    """
+    merged = {field: round(statistics.median(run[field] for run in runs), 3) for field in runs[0]}
+    merged['errors'] = max(run['errors'] for run in runs)
+    return merged
+
+
+def bench_server(name, args):
+    # Admission control would turn the closed loop into fast 503s (counted as errors) on the
+    # limited routes; the suite measures the routes, bench_overload.py measures the limiter
+    server = Server(name, args.workers, args.threads, extra_env={'DEVOPS_ADMISSION_LIMITS': ''})
+    try:
+        server.wait_ready()
+        results = {}
+        for method, path in ROUTES:
+            key = f"{method} {path}"
+            drive(server.port, method, path, args.connections, args.client_processes, args.warmup)
+            closed = median_run([
+                drive(server.port, method, path, args.connections, args.client_processes, args.duration)
+                for _ in range(args.repeat)
+            ])
+            rate = max(closed['throughput_rps'] * args.open_load, 1.0)
+            opened = median_run([
+                drive(server.port, method, path, args.connections * 2, args.client_processes,
+                      args.duration, rate=rate)
+                for _ in range(args.repeat)
+            ])
+            opened['offered_rps'] = round(rate, 1)
+            results[key] = {"closed_loop": closed, "open_loop": opened}
+            print(f"  {name:<17} {key:<26} closed {closed['throughput_rps']:>8.1f} req/s "
+                  f"p99 {closed['p99_ms']:>8.2f}ms | open @{rate:>7.1f} req/s p99 {opened['p99_ms']:>8.2f}ms"
+                  f" | errors {closed['errors'] + opened['errors']}")
+        rss = server.rss_bytes()
+        print(f"  {name:<17} RSS {rss / (1024 * 1024):.1f}MB")
+        return {"routes": results, "rss_bytes": rss}
+    finally:
+        server.stop()
+
+
+def compare(current, baseline, args):
+    """Regressions of current against baseline, as (server, route, kind, human-readable line)"""
+    regressions = []
+    for server, result in current.items():
+        base = baseline.get('servers', {}).get(server)
+        if base is None:
+            continue
+        if result['rss_bytes'] > base['rss_bytes'] * (1 + args.rss_tolerance):
+            regressions.append((server, None, 'rss',
+                                f"{server}: RSS {base['rss_bytes'] >> 20}MB -> {result['rss_bytes'] >> 20}MB"))
+        for route, runs in result['routes'].items():
+            old = base['routes'].get(route)
+            if old is None:
+                continue
+            closed, old_closed = runs['closed_loop'], old['closed_loop']
+            if closed['throughput_rps'] < old_closed['throughput_rps'] * (1 - args.throughput_tolerance):
+                regressions.append((server, route, 'throughput', f"{server} {route}: closed-loop throughput "
+                                    f"{old_closed['throughput_rps']} -> {closed['throughput_rps']} req/s"))
+            opened, old_opened = runs['open_loop'], old['open_loop']
+            if opened['p99_ms'] > old_opened['p99_ms'] * (1 + args.latency_tolerance):
+                regressions.append((server, route, 'p99',
+                                    f"{server} {route}: open-loop p99 {old_opened['p99_ms']} -> {opened['p99_ms']}ms"))
+            if closed['errors'] + opened['errors'] > old_closed['errors'] + old_opened['errors']:
+                regressions.append((server, route, 'errors',
+                                    f"{server} {route}: errors {closed['errors'] + opened['errors']}"))
+    return regressions
+
+
+def confirm(regressions, baseline, args):
+    """Measure the regressed servers again, only what regresses every time is kept"""
+    for _ in range(args.confirm):
+        if not regressions:
+            break
+        print(f"{len(regressions)} regression(s), measuring again to tell them from noise")
+        seen = {regression[:3] for regression in regressions}
+        again = {}
+        for name in sorted({regression[0] for regression in regressions}):
+            print(f"{name}:")
+            again[name] = bench_server(name, args)
+        regressions = [regression for regression in compare(again, baseline, args) if regression[:3] in seen]
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default=','.join(SERVERS))
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per measured run")
+    parser.add_argument('--warmup', type=float, default=1.0, help="seconds of unmeasured load before each route")
+    parser.add_argument('--connections', type=int, default=32, help="concurrent closed-loop clients")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per loop, the median of each number counts")
+    parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--open-load', type=float, default=0.7,
+                        help="open-loop rate as a fraction of the measured closed-loop throughput")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=8, help="threads per gthread worker")
+    parser.add_argument('--save', metavar='PATH', help="write the results as a new baseline")
+    parser.add_argument('--compare', metavar='PATH', help="fail on regressions against this baseline")
+    parser.add_argument('--throughput-tolerance', type=float, default=0.30)
+    parser.add_argument('--latency-tolerance', type=float, default=0.60)
+    parser.add_argument('--rss-tolerance', type=float, default=0.20)
+    parser.add_argument('--confirm', type=int, default=1,
+                        help="times a regressed server is measured again before the regression counts")
+    args = parser.parse_args()
+
+    results = {}
+    for name in filter(None, args.servers.split(',')):
+        print(f"{name}:")
+        results[name] = bench_server(name, args)
+
+    report = {
+        "recorded_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "host": socket.gethostname(),
+        "cpus": os.cpu_count(),
+        "settings": {key: getattr(args, key) for key in
+                     ('duration', 'connections', 'repeat', 'client_processes', 'open_load', 'workers', 'threads')},
+        "servers": results,
+    }
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = confirm(compare(results, baseline, args), baseline, args)
+        for _server, _route, _kind, line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Startup and memory: preloaded copy-on-write workers against a fresh import per worker
+
+    python benchmarks/bench_startup.py [--workers 4] [--threads 8] [--respawns 3] [--requests 200]
+
+gunicorn is started twice with gunicorn.conf.py, once with GUNICORN_PRELOAD=0
+(every worker imports and builds the app itself) and once with the default
+preload. A wrapper config records when the master forks each worker and when
+that worker has finished initializing. Reported per run:
+
+  startup    launch until every worker is initialized
+  boot       per worker, fork until initialized (median)
+  respawn    SIGKILL of a worker until its replacement is initialized (median)
+  memory     per worker after `--requests` requests to every route: RSS, PSS
+             (shared pages split between the processes sharing them) and
+             private memory, from /proc/<pid>/smaps_rollup; plus the PSS of
+             master and workers together, which is what the instance pays.
+"""
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import ROOT, ROUTES, Server  # noqa: E402
+
+CONFIG = os.path.join(ROOT, 'gunicorn.conf.py')
+
+# Runs gunicorn.conf.py, then wraps its hooks to log (monotonic time, event, worker age[, pid])
+WRAPPER = '''
+import os
+import time
+
+exec(compile(open({config!r}).read(), {config!r}, 'exec'))
+
+_hooks = (pre_fork, post_worker_init)
+
+
+def _event(*fields):
+    with open({events!r}, 'a') as handle:
+        handle.write(' '.join(map(str, (time.monotonic(),) + fields)) + '\\n')
+
+
+def pre_fork(server, worker):
+    _hooks[0](server, worker)
+    _event('fork', worker.age)
+
+
+def post_worker_init(worker):
+    _hooks[1](worker)
+    _event('ready', worker.age, os.getpid())
+'''
+
+
+def read_events(path):
+    """{age: {'fork': ts, 'ready': ts, 'pid': pid}} from the wrapper's log"""
+    workers = {}
+    try:
+        with open(path) as handle:
+            lines = handle.read().splitlines()
+    except FileNotFoundError:
+        return workers
+    for line in lines:
+        fields = line.split()
+        entry = workers.setdefault(int(fields[2]), {})
+        entry[fields[1]] = float(fields[0])
+        if fields[1] == 'ready':
+            entry['pid'] = int(fields[3])
+    return workers
+
+
+def wait_for(predicate, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.01)
+    raise RuntimeError("timed out waiting for the workers")
+
+
+def smaps_rollup(pid):
+    """(rss, pss, private) bytes of one process"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def warm(port, requests):
+    """`requests` requests to every route, new connections so they spread over the workers"""
+    for method, path in ROUTES:
+        for _ in range(requests):
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            connection.request(method, path, body=b'' if method == 'POST' else None)
+            connection.getresponse().read()
+            connection.close()
+
+
+def run(label, args, preload):
+    scratch = tempfile.mkdtemp(prefix='devops-bench-startup-')
+    events = os.path.join(scratch, 'events.log')
+    wrapper = os.path.join(scratch, 'gunicorn_bench.conf.py')
+    with open(wrapper, 'w') as handle:
+        handle.write(WRAPPER.format(config=CONFIG, events=events))
+    env = {'GUNICORN_WORKERS': str(args.workers), 'GUNICORN_THREADS': str(args.threads),
+           'GUNICORN_PRELOAD': '1' if preload else '0'}
+    command = [sys.executable, '-m', 'gunicorn', '--chdir', ROOT, '-c', wrapper, 'app:app']
+    launched = time.monotonic()
+    server = Server('gunicorn-gthread', args.workers, args.threads, extra_env=env, command=command)
+
+    def all_ready():
+        workers = read_events(events)
+        return workers if sum('ready' in entry for entry in workers.values()) >= args.workers else None
+
+    try:
+        initial = wait_for(all_ready)
+        startup = max(entry['ready'] for entry in initial.values()) - launched
+        server.wait_ready()
+
+        respawns = []
+        for _ in range(args.respawns):
+            workers = read_events(events)
+            age = max(workers)
+            victim = workers[age]['pid']
+            killed = time.monotonic()
+            os.kill(victim, signal.SIGKILL)
+            replacement = wait_for(lambda: read_events(events).get(age + 1, {}).get('ready'))
+            respawns.append(replacement - killed)
+        server.wait_ready()
+
+        warm(server.port, args.requests)
+        workers = read_events(events)
+        live = [entry['pid'] for entry in workers.values()
+                if 'pid' in entry and os.path.exists(f"/proc/{entry['pid']}")]
+        memory = [smaps_rollup(pid) for pid in live]
+        total_pss = smaps_rollup(server.process.pid)[1] + sum(pss for _, pss, _ in memory)
+    finally:
+        server.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    boots = [entry['ready'] - entry['fork'] for entry in workers.values() if 'fork' in entry and 'ready' in entry]
+    mib = 1024 * 1024
+    rss, pss, private = (statistics.mean(values) / mib for values in zip(*memory))
+    print(f"{label:<12} startup {startup * 1000:>8.1f}ms | boot p50 {statistics.median(boots) * 1000:>8.1f}ms | "
+          f"respawn p50 {statistics.median(respawns) * 1000:>8.1f}ms | per worker: RSS {rss:>6.1f} MiB, "
+          f"PSS {pss:>6.1f} MiB, private {private:>6.1f} MiB | total PSS {total_pss / mib:>6.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help="threads per gthread worker")
+    parser.add_argument('--respawns', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=200, help="warm-up requests per route before measuring")
+    args = parser.parse_args()
+
+    run("fresh import", args, preload=False)
+    run("preloaded", args, preload=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Overload admission control: per-route concurrency and rate limits with a reserve for health checks"""
+import math
+import threading
+import time
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """0.0 when a token was taken, else the seconds until one is available"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+
+class RouteLimit:
+    """Concurrency (and optionally rate) limit for one endpoint"""
+
+    def __init__(self, endpoint, concurrency, rate=None, burst=None):
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst or max(rate, 1.0)) if rate else None
+        self.admitted = 0
+        self.shed = 0
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def parse_limits(spec):
+    """'endpoint=concurrency[:rate/burst],...' -> [RouteLimit], e.g. 'deployment_history=4,record_devops_deployment=2:50/100'"""
+    limits = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        endpoint, _, limit = item.partition('=')
+        concurrency, _, rate = limit.partition(':')
+        rate, _, burst = rate.partition('/')
+        limits.append(RouteLimit(endpoint.strip(), max(int(concurrency), 1),
+                                 float(rate) if rate else None, float(burst) if burst else None))
+    return limits
+
+
+class AdmissionController:
+    """Decides in before_request whether a request may run now.
+
+    Only routes with a RouteLimit are controlled; everything else (health
+    checks above all) is always admitted. The limited routes also share a
+    pool of `capacity - reserve` slots, so however they are flooded at least
+    `reserve` worker threads stay free for the uncontrolled ones. A limited
+    request either gets a slot right away or is rejected: it never waits
+    for one, since a thread parked on a semaphore is a thread the health
+    checks queued behind it cannot use. An empty token bucket rejects it
+    as well.
+    """
+
+    def __init__(self, limits, capacity=32, reserve=4, retry_after=1):
+        self.limits = {limit.endpoint: limit for limit in limits}
+        self.capacity = capacity
+        self.reserve = reserve
+        self.retry_after = retry_after
+        self.shared = threading.BoundedSemaphore(max(capacity - reserve, 1))
+
+    def admit(self, endpoint):
+        """Returns the RouteLimit to release() when done (None if uncontrolled), or raises Rejected"""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return None
+        if limit.bucket is not None:
+            wait = limit.bucket.take()
+            if wait:
+                limit.shed += 1
+                raise Rejected("rate limited", max(math.ceil(wait), 1))
+        if limit.slots.acquire(blocking=False):
+            if self.shared.acquire(blocking=False):
+                limit.admitted += 1
+                return limit
+            limit.slots.release()
+        limit.shed += 1
+        raise Rejected("overloaded", self.retry_after)
+
+    def release(self, limit):
+        self.shared.release()
+        limit.slots.release()
+
+    def hold(self):
+        """Take a shared slot for a long-lived response (a stream) without waiting; False if none is free"""
+        return self.shared.acquire(blocking=False)
+
+    def unhold(self):
+        self.shared.release()
+
+    def report(self):
+        return {
+            "capacity": self.capacity,
+            "health_reserve": self.reserve,
+            "routes": {
+                endpoint: {
+                    "concurrency": limit.concurrency,
+                    "rate_per_second": limit.bucket.rate if limit.bucket else None,
+                    "admitted": limit.admitted,
+                    "shed": limit.shed
+                } for endpoint, limit in sorted(self.limits.items())
+            }
+        }
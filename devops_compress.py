@@ -0,0 +1,118 @@
+"""Accept-Encoding negotiation and response compression (gzip, brotli when installed)"""
+import collections
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+# Preferred first when the client weighs them equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/openmetrics-text',
+                      'application/javascript', 'image/svg+xml')
+
+# Bodies compressed once and cached can afford the slowest setting, per-request ones can not
+STATIC_LEVELS = {'gzip': 9, 'br': 11}
+DYNAMIC_LEVELS = {'gzip': 6, 'br': 4}
+
+
+def compressible(mimetype):
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def negotiate(accept_encoding, available=ENCODINGS):
+    """Best content coding the client accepts, None for identity"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    wildcard = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    # wbits=31 writes a gzip container with a zeroed mtime, so output is deterministic
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), each body compressed once"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding, body):
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                return compressed
+        compressed = compress(body, encoding, STATIC_LEVELS[encoding])
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+class ResponseCompressor:
+    """after_request hook: compresses eligible responses for the negotiated encoding.
+
+    Responses carrying an ETag are compressed once at the highest level and
+    served from the cache afterwards; anything else is compressed per
+    request, and only above `min_size`. Streamed bodies (SSE, NDJSON) are
+    passed through untouched.
+    """
+
+    def __init__(self, min_size=1024, cache_size=32):
+        self.min_size = min_size
+        self.cache = CompressedBodyCache(cache_size)
+
+    def __call__(self, request, response):
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or 'Content-Encoding' in response.headers or not compressible(response.mimetype)):
+            return response
+        response.vary.add('Accept-Encoding')
+        if 'no-transform' in response.headers.get('Cache-Control', ''):
+            return response
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        etag, weak = response.get_etag()
+        if etag:
+            compressed = self.cache.get(etag, encoding, body)
+            # The encoded bytes differ, so the validator can no longer be a strong one;
+            # weak comparison still matches it against the identity ETag for 304s
+            response.set_etag(etag, weak=True)
+        else:
+            compressed = compress(body, encoding, DYNAMIC_LEVELS[encoding])
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,48 @@
+"""Time-sortable unique ids (ULID layout) for deployments, artifacts and incidents"""
+import itertools
+import os
+import random
+import time
+
+# Crockford base32: no I, L, O or U, and ascending in ASCII so ids sort as strings
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+NODE_BITS = 40      # 22 bits of pid + 18 random bits, drawn per process
+SEQUENCE_BITS = 40
+_NODE_MASK = (1 << NODE_BITS) - 1
+_SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+# Two characters (10 bits) per lookup, 13 lookups per id
+_PAIRS = [first + second for first in ALPHABET for second in ALPHABET]
+
+
+def encode(value):
+    """128-bit integer as 26 Crockford base32 characters"""
+    return ''.join([_PAIRS[(value >> shift) & 0x3FF] for shift in range(120, -1, -10)])
+
+
+class IdGenerator:
+    """48-bit millisecond timestamp | 40-bit node | 40-bit sequence.
+
+    The node (pid plus random bits) keeps processes apart, even across hosts
+    sharing the database; within a process next() on an itertools.count is
+    atomic, so threads never collide and nothing is locked. The timestamp is
+    wall-clock time at startup advanced by the monotonic clock, so ids from
+    one process never go backwards when the system clock is stepped. The node,
+    sequence and clock anchor are drawn again in every forked worker.
+    """
+
+    def __init__(self):
+        self._seed()
+        os.register_at_fork(after_in_child=self._seed)
+
+    def _seed(self):
+        self._node = (((os.getpid() & 0x3FFFFF) << 18) | random.getrandbits(18)) & _NODE_MASK
+        self._sequence = itertools.count(random.getrandbits(SEQUENCE_BITS - 8))
+        self._wall_ms = time.time_ns() // 1000000
+        self._monotonic_ns = time.monotonic_ns()
+
+    def new_id(self):
+        millis = self._wall_ms + (time.monotonic_ns() - self._monotonic_ns) // 1000000
+        sequence = next(self._sequence) & _SEQUENCE_MASK
+        return encode((millis << (NODE_BITS + SEQUENCE_BITS)) | (self._node << SEQUENCE_BITS) | sequence)
@@ -0,0 +1,92 @@
+"""Incremental parsers for batch request bodies (NDJSON or a JSON array)"""
+import codecs
+import json
+import re
+
+READ_SIZE = 64 * 1024
+MAX_ELEMENT_SIZE = 1024 * 1024  # characters (bytes for an NDJSON line), a single record larger than this is rejected
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+_SEPARATOR = re.compile(r'[ \t\r\n]*[,\]]')
+
+
+def iter_ndjson(stream):
+    """One value per non-blank line, read from the stream as it arrives"""
+    number = 0
+    while True:
+        # Bounded read: a line without a newline in sight is never buffered whole
+        line = stream.readline(MAX_ELEMENT_SIZE + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > MAX_ELEMENT_SIZE and not line.endswith(b'\n'):
+            raise ValueError(f"line {number}: longer than {MAX_ELEMENT_SIZE} bytes")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+
+
+def iter_json_array(stream, read_size=READ_SIZE):
+    """Elements of a top-level JSON array, decoded one at a time.
+
+    Only the element being decoded and one read are ever buffered, so a
+    body of any length is parsed in bounded memory.
+    """
+    buffer, position, eof = '', 0, False
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def fill():
+        nonlocal buffer, position, eof
+        if len(buffer) - position > MAX_ELEMENT_SIZE:
+            raise ValueError(f"array element larger than {MAX_ELEMENT_SIZE} characters")
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + decoder.decode(chunk, eof)
+        position = 0
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if buffer[position:position + 1] != '[':
+        raise ValueError("expected a JSON array")
+    position += 1
+    skip_whitespace()
+    if buffer[position:position + 1] == ']':
+        return
+    while True:
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise ValueError("truncated or invalid JSON array element") from None
+                fill()  # the element may just continue in the next read
+                continue
+            if not eof and not _SEPARATOR.match(buffer, end):
+                # Cut short by the read ("12" of "123", "2." of "2.5"), decode again with more
+                fill()
+                continue
+            break
+        position = end
+        yield value
+        skip_whitespace()
+        separator = buffer[position:position + 1]
+        position += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError("expected ',' or ']' between array elements")
+        skip_whitespace()
+
@@ -0,0 +1,83 @@
+"""Fast JSON encoding and payloads pre-serialized around their few dynamic fields"""
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder gives the same document
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """Compact, key-sorted JSON as UTF-8 bytes"""
+        return orjson.dumps(value, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=True, ensure_ascii=False)
+
+    def dumps(value):
+        """Compact, key-sorted JSON as UTF-8 bytes"""
+        return _encoder.encode(value).encode('utf-8')
+
+ENCODER = 'orjson' if orjson is not None else 'json'
+
+
+class Dynamic:
+    """Placeholder for a field filled in on every render"""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class RawJson(bytes):
+    """Already-serialized JSON, spliced into a render as-is"""
+
+
+_MARKER = '\x00dynamic:%s\x00'
+# Both encoders escape NUL, so a marker can never collide with real data
+_MARKER_PATTERN = re.compile(rb'"\\u0000dynamic:([^"\\]+)\\u0000"')
+
+
+class JsonTemplate:
+    """A JSON document serialized once, with Dynamic placeholders left open.
+
+    `build` returns the document (only called on first use, so it sees the
+    final app config); rendering joins the static byte runs with the
+    encoded dynamic values, so only those are serialized per request.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._parts = None
+
+    def _compile(self):
+        def mark(value):
+            if isinstance(value, Dynamic):
+                return _MARKER % value.name
+            if isinstance(value, dict):
+                return {key: mark(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [mark(item) for item in value]
+            return value
+
+        pieces = _MARKER_PATTERN.split(dumps(mark(self.build())) + b'\n')
+        # Even positions are static bytes, odd positions are field names
+        return [piece if position % 2 == 0 else piece.decode() for position, piece in enumerate(pieces)]
+
+    def compile(self):
+        """Serialize the static parts now rather than on first render"""
+        if self._parts is None:
+            self._parts = self._compile()
+
+    def render(self, **values):
+        parts = self._parts
+        if parts is None:
+            parts = self._parts = self._compile()
+        out = [parts[0]]
+        for position in range(1, len(parts), 2):
+            value = values[parts[position]]
+            out.append(value if isinstance(value, RawJson) else dumps(value))
+            out.append(parts[position + 1])
+        return b''.join(out)
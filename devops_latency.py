@@ -0,0 +1,253 @@
+"""Fixed-memory request latency histograms for the DevOps monitoring endpoints"""
+import threading
+
+# Log-bucketed layout (HDR style): values below 2 * SUB_BUCKETS microseconds get
+# their own bucket, above that every power of two is split into SUB_BUCKETS
+# linear sub-buckets, so the relative error of any percentile is under 1/16.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_SHIFT_BASE = SUB_BUCKET_BITS + 1
+MAX_TRACKABLE_US = (1 << 27) - 1  # ~134s, slower requests land in the last bucket
+BUCKET_COUNT = ((MAX_TRACKABLE_US.bit_length() - _SHIFT_BASE) << SUB_BUCKET_BITS) + (1 << _SHIFT_BASE)
+
+# Trailing cells of every counts list
+_COUNT = BUCKET_COUNT
+_SUM = BUCKET_COUNT + 1
+_MAX = BUCKET_COUNT + 2
+_CELLS = BUCKET_COUNT + 3
+_EMPTY = (0,) * _CELLS
+
+# Sliding windows are built from a ring of fixed-width time slots
+SLOT_SECONDS = 10
+WINDOWS = {'1m': 60, '5m': 300}
+SLOT_COUNT = max(WINDOWS.values()) // SLOT_SECONDS
+
+
+def bucket_index(micros):
+    """Bucket holding a latency expressed in whole microseconds"""
+    if micros > MAX_TRACKABLE_US:
+        micros = MAX_TRACKABLE_US
+    shift = micros.bit_length() - _SHIFT_BASE
+    if shift <= 0:
+        return micros
+    return (shift << SUB_BUCKET_BITS) + (micros >> shift)
+
+
+def bucket_bounds(index):
+    """Inclusive (low, high) microsecond range covered by a bucket"""
+    if index < (1 << _SHIFT_BASE):
+        return index, index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = index - (shift << SUB_BUCKET_BITS)
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+def _percentile(counts, total, fraction):
+    rank = fraction * total
+    seen = 0
+    for index in range(BUCKET_COUNT):
+        seen += counts[index]
+        if seen >= rank and seen:
+            low, high = bucket_bounds(index)
+            return (low + high) / 2.0
+    return 0.0
+
+
+def summarize(counts, seconds=None):
+    """Turn a counts list into the JSON-friendly latency summary"""
+    total = counts[_COUNT]
+    if not total:
+        summary = {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None, "mean_ms": None}
+    else:
+        max_us = counts[_MAX]
+        summary = {
+            "count": total,
+            "p50_ms": round(min(_percentile(counts, total, 0.50), max_us) / 1000.0, 3),
+            "p95_ms": round(min(_percentile(counts, total, 0.95), max_us) / 1000.0, 3),
+            "p99_ms": round(min(_percentile(counts, total, 0.99), max_us) / 1000.0, 3),
+            "max_ms": round(max_us / 1000.0, 3),
+            "mean_ms": round(counts[_SUM] / total / 1000.0, 3),
+        }
+    if seconds:
+        summary["requests_per_second"] = round(total / seconds, 3)
+    return summary
+
+
+def cumulative_buckets(counts, bounds_us):
+    """Observations <= each bound (Prometheus `le` semantics, to bucket resolution)"""
+    cumulative = []
+    seen = 0
+    index = 0
+    for bound in bounds_us:
+        while index < BUCKET_COUNT and bucket_bounds(index)[1] <= bound:
+            seen += counts[index]
+            index += 1
+        cumulative.append(seen)
+    return cumulative, counts[_COUNT], counts[_SUM]
+
+
+def new_counts():
+    """Empty counts list: the buckets, then count, sum and max"""
+    return [0] * _CELLS
+
+
+def record_into(counts, value):
+    """Add one observation (any integer unit, microseconds for request latency) to a counts list"""
+    counts[bucket_index(value)] += 1
+    counts[_COUNT] += 1
+    counts[_SUM] += value
+    if value > counts[_MAX]:
+        counts[_MAX] = value
+
+
+def merge_into(target, source):
+    """Add the buckets of source into target"""
+    for index in range(_MAX):
+        target[index] += source[index]
+    if source[_MAX] > target[_MAX]:
+        target[_MAX] = source[_MAX]
+
+
+class LatencyHistogram:
+    """Ring of per-slot histograms for sliding windows, the lifetime counts are derived from it.
+
+    A request only touches the current slot. When a slot is recycled its
+    counts are folded into `_retired`, so lifetime = retired + the ring.
+    """
+
+    def __init__(self, now):
+        self.started = now
+        self._retired = [0] * _CELLS
+        self._slots = [[0] * _CELLS for _ in range(SLOT_COUNT)]
+        self._epochs = [-1] * SLOT_COUNT
+        self._current = self._slots[0]
+        self._until = float('-inf')  # end of the current slot, the first record() moves to a real one
+        self._lock = threading.Lock()
+
+    def record(self, seconds, now):
+        """Hot path - called once per request, keep it to a handful of bytecodes"""
+        if now >= self._until:
+            self._advance(now)
+        slot = self._current
+        micros = int(seconds * 1000000)
+        shift = micros.bit_length() - _SHIFT_BASE
+        if shift <= 0:
+            slot[micros] += 1
+        elif micros <= MAX_TRACKABLE_US:
+            slot[(shift << SUB_BUCKET_BITS) + (micros >> shift)] += 1
+        else:
+            slot[BUCKET_COUNT - 1] += 1
+        slot[_COUNT] += 1
+        slot[_SUM] += micros
+        if micros > slot[_MAX]:
+            slot[_MAX] = micros
+
+    def _advance(self, now):
+        # Once per SLOT_SECONDS at most; the lock keeps two threads from retiring the same slot twice
+        with self._lock:
+            if now < self._until:
+                return
+            epoch = int(now) // SLOT_SECONDS
+            position = epoch % SLOT_COUNT
+            slot = self._slots[position]
+            if self._epochs[position] != epoch:
+                # Recycle the slot from SLOT_COUNT periods ago
+                merge_into(self._retired, slot)
+                slot[:] = _EMPTY
+                self._epochs[position] = epoch
+            self._current = slot
+            self._until = (epoch + 1) * SLOT_SECONDS
+
+    @property
+    def count(self):
+        return self._retired[_COUNT] + sum(slot[_COUNT] for slot in self._slots)
+
+    @property
+    def lifetime(self):
+        merged = list(self._retired)
+        with self._lock:
+            for slot in self._slots:
+                merge_into(merged, slot)
+        return merged
+
+    def windows(self, now):
+        """{window: counts} for every sliding window plus the lifetime, merging each slot once"""
+        current = int(now) // SLOT_SECONDS
+        merged = [0] * _CELLS
+        counts = {}
+        with self._lock:
+            # Newest first: every window is a prefix of this list, the lifetime all of it
+            live = sorted(((epoch, position) for position, epoch in enumerate(self._epochs) if epoch >= 0),
+                          reverse=True)
+            index = 0
+            for name, seconds in sorted(WINDOWS.items(), key=lambda item: item[1]):
+                oldest = current - seconds // SLOT_SECONDS + 1
+                while index < len(live) and live[index][0] >= oldest:
+                    merge_into(merged, self._slots[live[index][1]])
+                    index += 1
+                counts[name] = list(merged)
+            for _, position in live[index:]:
+                merge_into(merged, self._slots[position])
+            merge_into(merged, self._retired)
+        counts["lifetime"] = merged
+        return counts
+
+
+class LatencyRegistry:
+    """Per-endpoint latency histograms"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.started = clock()
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._overall = (None, None)  # (computed_at, summary)
+
+    def histogram_for(self, endpoint):
+        """The endpoint's histogram, created on first use; callers can keep it and record() on it directly"""
+        histogram = self._histograms.get(endpoint)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(endpoint, LatencyHistogram(self.clock()))
+        return histogram
+
+    def record(self, endpoint, seconds, now):
+        self.histogram_for(endpoint).record(seconds, now)
+
+    def endpoints(self):
+        return sorted(self._histograms)
+
+    def histogram(self, endpoint):
+        return self._histograms.get(endpoint)
+
+    def _summaries(self, histograms, now):
+        merged = {name: [0] * _CELLS for name in (*WINDOWS, "lifetime")}
+        for histogram in histograms:
+            for name, counts in histogram.windows(now).items():
+                merge_into(merged[name], counts)
+        windows = {name: summarize(merged[name], max(min(seconds, now - self.started), 1.0))
+                   for name, seconds in WINDOWS.items()}
+        windows["lifetime"] = summarize(merged["lifetime"], max(now - self.started, 1.0))
+        return windows
+
+    def overall_summary(self, max_age=1.0):
+        """All-endpoints windows, recomputed at most once per max_age seconds.
+
+        Health checks read this on every call, merging every histogram each
+        time would cost more than the rest of the request.
+        """
+        now = self.clock()
+        computed_at, summary = self._overall
+        if computed_at is None or now - computed_at >= max_age:
+            summary = self._summaries(list(self._histograms.values()), now)
+            self._overall = (now, summary)
+        return summary
+
+    def report(self):
+        """Latency windows for every endpoint plus the all-endpoints rollup"""
+        now = self.clock()
+        histograms = dict(self._histograms)
+        return {
+            "overall": self._summaries(list(histograms.values()), now),
+            "endpoints": {name: self._summaries([histograms[name]], now) for name in sorted(histograms)},
+        }
@@ -0,0 +1,171 @@
+"""Non-blocking, batched and sampled logging for the request path"""
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+
+class BatchingQueueListener:
+    """Background writer that drains the log queue in batches.
+
+    Records are formatted here, off the request thread, and every handler
+    gets one write() and one flush() per batch instead of one per record.
+    """
+
+    def __init__(self, handlers, batch_size=512, flush_interval=0.25, maxsize=10000):
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # The writer thread does not survive fork(), and the queue's locks may have been
+        # held by it at the time: children start from a fresh queue and start lazily
+        self.queue = queue.Queue(self.maxsize)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="devops-log-writer", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def enqueue(self, record):
+        self.ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging, shed load instead
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if record is None:
+                return
+            batch = [record]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            self.write_batch(batch)
+            if stop:
+                return
+
+    def write_batch(self, records):
+        for handler in self.handlers:
+            selected = [record for record in records if record.levelno >= handler.level and handler.filter(record)]
+            if not selected:
+                continue
+            if not isinstance(handler, logging.StreamHandler):
+                for record in selected:
+                    handler.handle(record)
+                continue
+            lines = []
+            for record in selected:
+                try:
+                    lines.append(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            handler.acquire()
+            try:
+                if handler.stream is None:
+                    handler.stream = handler._open()  # FileHandler opened with delay=True
+                handler.stream.write(''.join(lines))
+                handler.flush()
+            except Exception:
+                handler.handleError(selected[-1])
+            finally:
+                handler.release()
+
+    def stop(self):
+        """Flush everything still queued and stop the writer"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self.queue.put(None)
+        thread.join()
+        self._pid = None
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the writer thread.
+
+    The stock QueueHandler formats the message in prepare(), on the calling
+    thread; here the record goes onto the queue untouched, so a message is
+    only ever built if it is actually written.
+    """
+
+    def __init__(self, listener):
+        super().__init__(listener.queue)
+        self.listener = listener
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        self.listener.enqueue(record)
+
+
+class RequestLogSampler:
+    """Per-endpoint 1-in-N sampling of request log lines"""
+
+    def __init__(self, rates, default_rate=1):
+        self.rates = dict(rates)
+        self.default_rate = default_rate
+        self._counters = {}
+
+    def rate(self, endpoint):
+        return self.rates.get(endpoint, self.default_rate)
+
+    def should_log(self, endpoint):
+        rate = self.rates.get(endpoint, self.default_rate)
+        if rate <= 1:
+            return True
+        counter = self._counters.get(endpoint)
+        if counter is None:
+            counter = self._counters.setdefault(endpoint, itertools.count())
+        # next() on itertools.count is atomic under the GIL, no lock needed
+        return next(counter) % rate == 0
+
+
+def parse_sample_rates(spec):
+    """'devops_health_check=1000,devops_dashboard=10' -> {'devops_health_check': 1000, ...}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        endpoint, _, rate = item.partition('=')
+        rates[endpoint.strip()] = max(int(rate), 1)
+    return rates
+
+
+def configure_logging(level, fmt, handlers, batch_size=512, flush_interval=0.25, maxsize=10000):
+    """Route the root logger through a queue drained by a batching background writer"""
+    formatter = logging.Formatter(fmt)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = BatchingQueueListener(handlers, batch_size, flush_interval, maxsize)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(LazyQueueHandler(listener))
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,169 @@
+"""Reverse tail, filters and an incremental level index over app.log"""
+import mmap
+import os
+import re
+import threading
+import time
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+# Matches the header written by the '%(asctime)s [%(levelname)s] %(name)s: %(message)s' format
+LINE_PATTERN = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) \[([A-Z]+)\] ([^:]*): ?(.*)$', re.S)
+
+# The level tag sits right after the fixed-width asctime, anywhere else it is message text
+ASCTIME_WIDTH = len('2024-01-01 00:00:00,000')
+_RECORD_LEVEL = rb'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3} \[([A-Z]+)\] '
+FIRST_RECORD_LEVEL = re.compile(_RECORD_LEVEL)
+NEXT_RECORD_LEVEL = re.compile(rb'\n' + _RECORD_LEVEL)  # the literal newline keeps the search fast
+
+INDEX_CHUNK = 8 * 1024 * 1024
+
+
+def asctime_key(ts):
+    """Unix seconds -> bytes comparable with the asctime prefix of a log line"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)).encode() + b',%03d' % int(ts % 1 * 1000)
+
+
+class LogFilter:
+    """Level / substring / time-range predicate evaluated on raw log bytes"""
+
+    def __init__(self, levels=None, contains=None, since=None, until=None):
+        self.levels = {level.encode() for level in levels} if levels else None
+        self.contains = contains.encode() if contains else None
+        self.since = asctime_key(since) if since is not None else None
+        self.until = asctime_key(until) if until is not None else None
+        # Bytes every matching record must contain, lets the scan jump with rfind(); a level
+        # needle only counts at its position in the record header (needle_at)
+        self.needle_at = None
+        if self.contains is not None:
+            self.needle = self.contains
+        elif self.levels is not None and len(self.levels) == 1:
+            self.needle = b' [%s] ' % next(iter(self.levels))
+            self.needle_at = ASCTIME_WIDTH
+        else:
+            self.needle = None
+
+    def matches(self, asctime, level, text):
+        if self.levels is not None and level not in self.levels:
+            return False
+        if self.until is not None and asctime >= self.until:
+            return False
+        if self.contains is not None and self.contains not in text:
+            return False
+        return True
+
+    def exhausted(self, asctime):
+        """Scanning newest to oldest, every record from here on is before `since`"""
+        return self.since is not None and asctime < self.since
+
+
+class LogReader:
+    """Serves app.log without ever reading the whole file into memory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = (None, 0, dict.fromkeys(LEVELS, 0))  # (inode, indexed offset, counts)
+
+    def level_counts(self):
+        """Records per level, only the bytes appended since the last call are scanned"""
+        with self._lock:
+            inode, offset, counts = self._index
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return dict.fromkeys(LEVELS, 0)
+            if stat.st_ino != inode or stat.st_size < offset:
+                # Rotated or truncated, start over
+                inode, offset, counts = stat.st_ino, 0, dict.fromkeys(LEVELS, 0)
+            counts = dict(counts)
+            with open(self.path, 'rb') as handle:
+                handle.seek(offset)
+                pending = b''
+                while True:
+                    chunk = handle.read(INDEX_CHUNK)
+                    if not chunk:
+                        break
+                    chunk = pending + chunk
+                    complete = chunk.rfind(b'\n') + 1
+                    pending = chunk[complete:]
+                    # Chunks start on a record boundary: match the first header, then every one after a newline
+                    first = FIRST_RECORD_LEVEL.match(chunk, 0, complete)
+                    found = NEXT_RECORD_LEVEL.findall(chunk, 0, complete)
+                    if first is not None:
+                        found.append(first.group(1))
+                    for level in LEVELS:
+                        counts[level] += found.count(level.encode())
+                    offset += complete
+            self._index = (inode, offset, counts)
+            return dict(counts)
+
+    def records(self, log_filter, limit):
+        """Matching records, newest first, produced lazily by a reverse scan of the mapped file"""
+        try:
+            handle = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with handle:
+            size = os.fstat(handle.fileno()).st_size
+            if not size:
+                return
+            with mmap.mmap(handle.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                produced = 0
+                continuation = []
+                needle = log_filter.needle
+                end = size - 1 if mm[size - 1:size] == b'\n' else size
+                while end > 0 and produced < limit:
+                    if needle is not None and not continuation:
+                        end = self._jump(mm, needle, end, log_filter.needle_at)
+                        if end < 0:
+                            return
+                    newline = mm.rfind(b'\n', 0, end)
+                    line = mm[newline + 1:end]
+                    end = newline
+                    match = LINE_PATTERN.match(line)
+                    if match is None:
+                        # Traceback or other continuation of the record above it
+                        continuation.append(line)
+                        continue
+                    asctime, level, name, message = match.groups()
+                    if continuation:
+                        message = b'\n'.join([message] + continuation[::-1])
+                        continuation = []
+                    if log_filter.exhausted(asctime):
+                        return
+                    if log_filter.matches(asctime, level, message):
+                        produced += 1
+                        yield {
+                            "timestamp": asctime.decode().replace(' ', 'T').replace(',', '.'),
+                            "level": level.decode(),
+                            "logger": name.decode('utf-8', 'replace'),
+                            "message": message.decode('utf-8', 'replace')
+                        }
+
+    @staticmethod
+    def _jump(mm, needle, end, needle_at=None):
+        """End of the newest record before `end` that contains `needle`, -1 if there is none.
+
+        The search itself runs in C, so selective filters skip over
+        non-matching stretches of the file instead of parsing every line.
+        With `needle_at`, only hits that many bytes into a line count.
+        """
+        search_end = end
+        while True:
+            hit = mm.rfind(needle, 0, search_end)
+            if hit < 0:
+                return -1
+            if needle_at is None or hit - (mm.rfind(b'\n', 0, hit) + 1) == needle_at:
+                break
+            search_end = hit
+        record_end = mm.find(b'\n', hit, end)
+        record_end = end if record_end < 0 else record_end
+        # Keep continuation lines below the hit (e.g. a traceback) attached to their record
+        while record_end < end:
+            next_end = mm.find(b'\n', record_end + 1, end)
+            next_end = end if next_end < 0 else next_end
+            if LINE_PATTERN.match(mm[record_end + 1:next_end]):
+                break
+            record_end = next_end
+        return record_end
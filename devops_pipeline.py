@@ -0,0 +1,244 @@
+"""DORA and pipeline metrics kept as rolling daily aggregates of Jenkins build/stage events"""
+import collections
+import datetime
+import logging
+import os
+import threading
+import time
+
+from devops_latency import new_counts, record_into, merge_into, summarize
+
+DAY_SECONDS = 86400
+SUCCESS = 'SUCCESS'
+JENKINS_RESULTS = ('SUCCESS', 'FAILURE', 'UNSTABLE', 'ABORTED', 'NOT_BUILT')
+
+logger = logging.getLogger("DevOpsApp")
+
+
+def format_duration(seconds):
+    """'15s', '2m 34s', '1h 5m', '2d 3h' like the rest of the dashboard"""
+    if seconds is None:
+        return None
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60}s"
+    if seconds < DAY_SECONDS:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    return f"{seconds // DAY_SECONDS}d {seconds % DAY_SECONDS // 3600}h"
+
+
+def percent(part, whole):
+    return f"{100.0 * part / whole:.1f}%" if whole else None
+
+
+def duration_summary(counts, unit_seconds):
+    """Percentiles of a counts list in seconds; values were recorded in units of `unit_seconds`.
+
+    summarize() reports microsecond inputs as milliseconds (divides by 1000),
+    so scaling its "_ms" fields by 1000 * unit_seconds gives seconds.
+    """
+    summary = summarize(counts)
+    scale = 1000 * unit_seconds
+    result = {"count": summary["count"]}
+    for name in ('p50', 'p95', 'p99', 'max', 'mean'):
+        value = summary[f"{name}_ms"]
+        result[f"{name}_seconds"] = round(value * scale, 3) if value is not None else None
+    return result
+
+
+class DayBucket:
+    __slots__ = ('day', 'counters', 'stages', 'lead_time')
+
+    def __init__(self, day):
+        self.day = day
+        self.counters = collections.Counter()
+        self.stages = {}                 # stage -> duration counts, in milliseconds
+        self.lead_time = new_counts()    # commit to successful build, in seconds
+
+
+class PipelineMetrics:
+    """Rolling `window_days` aggregates over the pipeline events in the deployment store.
+
+    Every worker tails the shared events table and folds new rows into one
+    bucket per UTC day; the window totals are adjusted as events arrive and
+    as days expire, so neither costs more than the events involved. Reads
+    check one sequence number and, when nothing changed, return the cached
+    report, so their cost does not depend on how many builds were recorded.
+    """
+
+    def __init__(self, store, stages, deploy_stage='Deploy', window_days=30, clock=time.time):
+        self.store = store
+        self.stages = tuple(stages)
+        self.deploy_stage = deploy_stage
+        self.window_days = window_days
+        self.clock = clock
+        self._buckets = [None] * window_days
+        self._totals = collections.Counter()
+        self._builds_by_month = collections.Counter()
+        self._last_build = None
+        self._last_stages = {}
+        self._coverage = None            # (ts, percent) of the newest Test report
+        self._seq = 0
+        self._today = None
+        self._report = (None, None)      # ((seq, day), report)
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def _advance(self, today):
+        """Drop the buckets that fell out of the window (caller holds the lock)"""
+        if today == self._today:
+            return
+        self._today = today
+        for position, bucket in enumerate(self._buckets):
+            if bucket is not None and bucket.day <= today - self.window_days:
+                self._totals.subtract(bucket.counters)
+                self._buckets[position] = None
+
+    def _bucket(self, day):
+        position = day % self.window_days
+        bucket = self._buckets[position]
+        if bucket is None or bucket.day != day:
+            if bucket is not None:
+                self._totals.subtract(bucket.counters)
+            bucket = self._buckets[position] = DayBucket(day)
+        return bucket
+
+    def _count(self, bucket, name, amount=1):
+        bucket.counters[name] += amount
+        self._totals[name] += amount
+
+    def _apply(self, event):
+        ts = event['ts']
+        # Reports format it as a UTC datetime: raise for one out of range before anything is counted
+        month = datetime.datetime.utcfromtimestamp(ts).strftime('%Y-%m')
+        day = min(int(ts // DAY_SECONDS), self._today)
+        if day <= self._today - self.window_days:
+            return  # older than the window, still stored for other consumers
+        bucket = self._bucket(day)
+        success = event['status'] == SUCCESS
+        if event['event'] == 'stage':
+            stage = event['stage']
+            counts = bucket.stages.get(stage)
+            if counts is None:
+                counts = bucket.stages[stage] = new_counts()
+            record_into(counts, int(event['duration_ms']))
+            self._count(bucket, f"stage_runs:{stage}")
+            if not success:
+                self._count(bucket, f"stage_failures:{stage}")
+            if stage == self.deploy_stage:
+                self._count(bucket, 'deployments' if success else 'failed_deployments')
+            last = self._last_stages.get(stage)
+            if last is None or ts >= last['ts']:
+                self._last_stages[stage] = event
+            if event.get('test_coverage') is not None and (self._coverage is None or ts >= self._coverage[0]):
+                self._coverage = (ts, event['test_coverage'])
+            return
+        self._count(bucket, 'builds')
+        self._count(bucket, 'build_duration_ms', int(event['duration_ms']))
+        if success:
+            self._count(bucket, 'successful_builds')
+            if event.get('commit_ts') is not None:
+                record_into(bucket.lead_time, max(int(ts - event['commit_ts']), 0))
+        self._builds_by_month[month] += 1
+        for stale in sorted(self._builds_by_month)[:-2]:
+            del self._builds_by_month[stale]  # only this month and the last are ever reported
+        if self._last_build is None or ts >= self._last_build['ts']:
+            self._last_build = event
+
+    def _catch_up(self, today):
+        """Fold in the events other workers (or this one) stored since the last read"""
+        latest = self.store.latest_pipeline_seq()
+        if latest <= self._seq and today == self._today:
+            return
+        with self._lock:
+            self._advance(today)
+            since = (today - self.window_days + 1) * DAY_SECONDS
+            while True:
+                rows = self.store.pipeline_events_since(self._seq, since)
+                for seq, event in rows:
+                    try:
+                        self._apply(event)
+                    except Exception:
+                        # A row this worker cannot fold in must not stall every later one
+                        logger.exception("Skipping pipeline event %d", seq)
+                    self._seq = seq
+                if len(rows) < 10000:
+                    break
+            # Rows up to `latest` that were older than the window were skipped, not pending
+            self._seq = max(self._seq, latest)
+
+    def report(self):
+        now = self.clock()
+        today = int(now // DAY_SECONDS)
+        self._catch_up(today)
+        key = (self._seq, today)
+        cached_key, report = self._report
+        if cached_key == key:
+            return report
+        with self._lock:
+            report = self._build_report(now, today)
+        self._report = (key, report)
+        return report
+
+    def _build_report(self, now, today):
+        buckets = [bucket for bucket in self._buckets if bucket is not None]
+        totals = self._totals
+        days = min(self.window_days, today - min(bucket.day for bucket in buckets) + 1) if buckets else None
+
+        # Histograms are merged over at most window_days buckets, once per change
+        stage_counts = {stage: new_counts() for stage in self.stages}
+        lead_time = new_counts()
+        for bucket in buckets:
+            merge_into(lead_time, bucket.lead_time)
+            for stage, counts in bucket.stages.items():
+                merge_into(stage_counts.setdefault(stage, new_counts()), counts)
+
+        deployments, failed = totals['deployments'], totals['failed_deployments']
+        builds, successful = totals['builds'], totals['successful_builds']
+        per_day = deployments / days if days else 0.0
+        lead = duration_summary(lead_time, 1)
+        stages = {}
+        for stage, counts in stage_counts.items():
+            last = self._last_stages.get(stage)
+            stages[stage] = {
+                "runs": totals[f"stage_runs:{stage}"],
+                "failures": totals[f"stage_failures:{stage}"],
+                "duration": duration_summary(counts, 0.001),
+                "last": {
+                    "build_number": last['build_number'],
+                    "status": last['status'],
+                    "duration": format_duration(last['duration_ms'] / 1000.0),
+                    "finished": datetime.datetime.utcfromtimestamp(last['ts']).isoformat()
+                } if last else None
+            }
+        avg_build_seconds = totals['build_duration_ms'] / builds / 1000.0 if builds else None
+        return {
+            "window_days": self.window_days,
+            "observed_days": days,
+            "computed_at": datetime.datetime.utcfromtimestamp(now).isoformat(),
+            "dora": {
+                "deployments": deployments,
+                "failed_deployments": failed,
+                "deployment_frequency_per_day": round(per_day, 3),
+                "deployment_frequency": f"{per_day * 7:.1f} per week",
+                "change_failure_rate": percent(failed, deployments + failed),
+                "deployment_success_rate": percent(deployments, deployments + failed),
+                "lead_time": {**lead, "median": format_duration(lead['p50_seconds'])}
+            },
+            "builds": {
+                "count": builds,
+                "successful": successful,
+                "success_rate": percent(successful, builds),
+                "avg_duration_seconds": round(avg_build_seconds, 3) if avg_build_seconds is not None else None,
+                "avg_duration": format_duration(avg_build_seconds),
+                "this_month": self._builds_by_month[datetime.datetime.utcfromtimestamp(now).strftime('%Y-%m')]
+            },
+            "stages": stages,
+            "test_coverage": f"{self._coverage[1]:g}%" if self._coverage else None,
+            "last_build": self._last_build
+        }
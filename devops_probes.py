@@ -0,0 +1,271 @@
+"""Real health probes refreshed in the background, health checks only read the snapshot"""
+import concurrent.futures
+import http.client
+import os
+import socket
+import threading
+import time
+import urllib.parse
+
+PASSING = "passing"
+WARNING = "warning"
+FAILING = "failing"
+PENDING = "pending"
+
+
+# System readers (/proc and statvfs)
+def read_meminfo(path='/proc/meminfo'):
+    """/proc/meminfo as {field: bytes}"""
+    info = {}
+    with open(path) as handle:
+        for line in handle:
+            name, _, rest = line.partition(':')
+            parts = rest.split()
+            if parts:
+                info[name] = int(parts[0]) * (1024 if len(parts) > 1 else 1)
+    return info
+
+
+def read_cpu_times(path='/proc/stat'):
+    """(busy, total) jiffies of the aggregate cpu line"""
+    with open(path) as handle:
+        fields = [int(value) for value in handle.readline().split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+    total = sum(fields[:8])
+    return total - idle, total
+
+
+def read_process_rss(path='/proc/self/status'):
+    """Resident set size of this process in bytes"""
+    with open(path) as handle:
+        for line in handle:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def disk_usage(path):
+    """(total, free-for-unprivileged) bytes of the filesystem holding path"""
+    stat = os.statvfs(path)
+    return stat.f_blocks * stat.f_frsize, stat.f_bavail * stat.f_frsize
+
+
+class Probe:
+    """One health check, run by the scheduler every `interval` seconds"""
+
+    def __init__(self, name, interval=10.0, timeout=2.0):
+        self.name = name
+        self.interval = interval
+        self.timeout = timeout
+
+    def check(self):
+        """Return (status, detail dict); raising counts as failing"""
+        raise NotImplementedError
+
+
+class DiskSpaceProbe(Probe):
+    def __init__(self, name='disk_space', path='/', warn_free_percent=10.0, fail_free_percent=5.0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.path = path
+        self.warn_free_percent = warn_free_percent
+        self.fail_free_percent = fail_free_percent
+
+    def check(self):
+        total, free = disk_usage(self.path)
+        free_percent = 100.0 * free / total if total else 0.0
+        status = PASSING
+        if free_percent < self.fail_free_percent:
+            status = FAILING
+        elif free_percent < self.warn_free_percent:
+            status = WARNING
+        return status, {
+            "path": self.path,
+            "total_bytes": total,
+            "used_bytes": total - free,
+            "free_bytes": free,
+            "free_percent": round(free_percent, 2)
+        }
+
+
+class MemoryProbe(Probe):
+    def __init__(self, name='memory', warn_available_percent=10.0, fail_available_percent=5.0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.warn_available_percent = warn_available_percent
+        self.fail_available_percent = fail_available_percent
+
+    def check(self):
+        info = read_meminfo()
+        total = info.get('MemTotal', 0)
+        available = info.get('MemAvailable', info.get('MemFree', 0))
+        available_percent = 100.0 * available / total if total else 0.0
+        status = PASSING
+        if available_percent < self.fail_available_percent:
+            status = FAILING
+        elif available_percent < self.warn_available_percent:
+            status = WARNING
+        return status, {
+            "total_bytes": total,
+            "available_bytes": available,
+            "available_percent": round(available_percent, 2),
+            "process_rss_bytes": read_process_rss()
+        }
+
+
+class CpuProbe(Probe):
+    """CPU utilisation between two consecutive runs of the probe"""
+
+    def __init__(self, name='cpu', warn_percent=90.0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.warn_percent = warn_percent
+        self._last = None
+
+    def check(self):
+        busy, total = read_cpu_times()
+        last, self._last = self._last, (busy, total)
+        usage = None
+        if last is not None and total > last[1]:
+            usage = round(100.0 * (busy - last[0]) / (total - last[1]), 2)
+        status = WARNING if usage is not None and usage >= self.warn_percent else PASSING
+        return status, {"usage_percent": usage, "load_average": list(os.getloadavg())}
+
+
+class TcpProbe(Probe):
+    """Dependency is up if a TCP connection can be opened within the timeout"""
+
+    def __init__(self, name, host, port, **kwargs):
+        super().__init__(name, **kwargs)
+        self.host = host
+        self.port = port
+
+    def check(self):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout):
+            pass
+        return PASSING, {"target": f"tcp://{self.host}:{self.port}"}
+
+
+class HttpProbe(Probe):
+    """Dependency is up if a GET answers with a non-5xx status within the timeout"""
+
+    def __init__(self, name, url, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        parsed = urllib.parse.urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self._host = parsed.netloc
+        self._path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+
+    def check(self):
+        connection = self._connection_class(self._host, timeout=self.timeout)
+        try:
+            connection.request('GET', self._path, headers={'User-Agent': 'devops-health-probe'})
+            status_code = connection.getresponse().status
+        finally:
+            connection.close()
+        return (FAILING if status_code >= 500 else PASSING), {"target": self.url, "status_code": status_code}
+
+
+class CallableProbe(Probe):
+    """Wraps a function that raises when the dependency is unhealthy"""
+
+    def __init__(self, name, func, **kwargs):
+        super().__init__(name, **kwargs)
+        self.func = func
+
+    def check(self):
+        return PASSING, self.func() or {}
+
+
+def parse_dependencies(spec, interval=10.0, timeout=2.0):
+    """'database=tcp://db:5432,external_apis=https://api/health' -> [TcpProbe, HttpProbe]"""
+    probes = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, target = item.partition('=')
+        parsed = urllib.parse.urlsplit(target.strip())
+        if parsed.scheme == 'tcp':
+            probes.append(TcpProbe(name.strip(), parsed.hostname, parsed.port, interval=interval, timeout=timeout))
+        elif parsed.scheme in ('http', 'https'):
+            probes.append(HttpProbe(name.strip(), target.strip(), interval=interval, timeout=timeout))
+        else:
+            raise ValueError(f"Unsupported health dependency target: {target}")
+    return probes
+
+
+class ProbeScheduler:
+    """Runs every probe concurrently on its own interval and keeps the latest results.
+
+    Readers get an immutable snapshot dict and never wait on a probe. A probe
+    that overruns its timeout is reported failing straight away, and is not
+    started again until the stuck run returns.
+    """
+
+    def __init__(self, probes, tick=0.1):
+        self.probes = list(probes)
+        self.tick = tick
+        self._snapshot = {probe.name: {"status": PENDING} for probe in self.probes}
+        self._pid = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Neither the scheduler thread nor the pool survive fork(), start again on first read
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                thread = threading.Thread(target=self._run, name="devops-health-probes", daemon=True)
+                thread.start()
+                self._pid = os.getpid()
+
+    def snapshot(self):
+        self.ensure_started()
+        return self._snapshot
+
+    def _publish(self, name, result):
+        snapshot = dict(self._snapshot)
+        snapshot[name] = result
+        self._snapshot = snapshot
+
+    def _execute(self, probe):
+        started = time.monotonic()
+        try:
+            status, detail = probe.check()
+        except Exception as e:
+            status, detail = FAILING, {"error": f"{type(e).__name__}: {e}"}
+        return {
+            "status": status,
+            "latency_ms": round((time.monotonic() - started) * 1000, 3),
+            "checked_at": time.time(),
+            **detail
+        }
+
+    def _run(self):
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(len(self.probes), 1),
+                                                         thread_name_prefix="devops-probe")
+        running = {}   # probe name -> (future, started)
+        next_due = {probe.name: 0.0 for probe in self.probes}
+        timed_out = set()
+        while True:
+            now = time.monotonic()
+            for probe in self.probes:
+                name = probe.name
+                if name in running:
+                    future, started = running[name]
+                    if future.done():
+                        del running[name]
+                        timed_out.discard(name)
+                        self._publish(name, future.result())
+                    elif now - started > probe.timeout and name not in timed_out:
+                        timed_out.add(name)
+                        self._publish(name, {
+                            "status": FAILING,
+                            "error": f"timed out after {probe.timeout}s",
+                            "checked_at": time.time()
+                        })
+                elif now >= next_due[name]:
+                    running[name] = (executor.submit(self._execute, probe), now)
+                    next_due[name] = now + probe.interval
+            time.sleep(self.tick)
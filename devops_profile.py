@@ -0,0 +1,99 @@
+"""On-demand sampling profiler over live traffic, output as collapsed stacks for flamegraphs"""
+import collections
+import os
+import sys
+import threading
+import time
+
+# Leaf frames of threads parked waiting for work, left out unless idle stacks are asked for
+IDLE_LEAVES = frozenset({
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+    ('base_events.py', '_run_once'),
+})
+
+
+def frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame, max_depth=128):
+    """Root-to-leaf 'file:function' labels joined with ';' (Brendan Gregg's collapsed format)"""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+# The app's own background threads, left out of profiles. Named individually: request threads
+# (e.g. the ASGI bridge's "devops-wsgi_N" pool) share the "devops-" prefix and must be sampled
+BACKGROUND_THREADS = ('devops-log-writer', 'devops-health-probes', 'devops-system-sampler',
+                      'devops-stream-publisher')
+BACKGROUND_POOLS = ('devops-probe_',)  # ThreadPoolExecutor names its threads prefix_N
+
+
+class ProfileBusy(Exception):
+    """Another profile is already running in this process"""
+
+
+class SamplingProfiler:
+    """Samples the stack of every thread every `interval` seconds for a fixed duration.
+
+    The caller's thread does the sampling itself (and is left out of the
+    result), nothing is installed into the interpreter, so requests pay no
+    tracing cost; only one profile runs at a time per process.
+    """
+
+    def __init__(self, interval=0.01, exclude_names=BACKGROUND_THREADS, exclude_prefixes=BACKGROUND_POOLS):
+        self.interval = interval
+        self.exclude_names = frozenset(exclude_names)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self._running = threading.Lock()
+
+    def _excluded_threads(self):
+        own = threading.get_ident()
+        excluded = {own}
+        for thread in threading.enumerate():
+            if thread.name in self.exclude_names or thread.name.startswith(self.exclude_prefixes):
+                excluded.add(thread.ident)
+        return excluded
+
+    def run(self, seconds, interval=None, include_idle=False):
+        """Counter of collapsed stack -> samples, plus the number of sampling passes"""
+        interval = interval or self.interval
+        if not self._running.acquire(blocking=False):
+            raise ProfileBusy()
+        try:
+            stacks = collections.Counter()
+            passes = 0
+            excluded = self._excluded_threads()
+            deadline = time.monotonic() + seconds
+            next_due = time.monotonic()
+            while next_due < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident in excluded:
+                        continue
+                    code = frame.f_code
+                    if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                        continue
+                    stacks[collapse(frame)] += 1
+                passes += 1
+                if passes % 50 == 0:
+                    excluded = self._excluded_threads()  # pick up threads started meanwhile
+                next_due += interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            return stacks, passes
+        finally:
+            self._running.release()
+
+
+def format_collapsed(stacks):
+    """One 'stack count' line per stack, hottest first"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,102 @@
+"""OpenMetrics text exposition with per-series serialization caching"""
+import math
+import threading
+import time
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+class MetricFamily:
+    """One metric family: header lines plus a collector yielding (suffix, labels, value)"""
+
+    def __init__(self, name, kind, help_text, collect, unit=None):
+        self.name = name
+        self.kind = kind
+        self.collect = collect
+        header = f"# TYPE {name} {kind}\n"
+        if unit:
+            header += f"# UNIT {name} {unit}\n"
+        header += f"# HELP {name} {escape_help(help_text)}\n"
+        self.header = header.encode('utf-8')
+
+
+class MetricsExposition:
+    """Serializes registered families, reusing every line whose value did not change.
+
+    Each series line is cached as bytes next to the value it was built from,
+    so a scrape only formats the samples that moved since the last one. A
+    scrape within `min_interval` of the previous one gets the previous body
+    without collecting anything at all.
+    """
+
+    def __init__(self, min_interval=1.0, clock=time.monotonic):
+        self.min_interval = min_interval
+        self.clock = clock
+        self.families = []
+        self._lines = {}
+        self._labels = {}
+        self._body = None
+        self._parts = 0
+        self._rendered_at = None
+        self._lock = threading.Lock()
+
+    def register(self, name, kind, help_text, collect, unit=None):
+        self.families.append(MetricFamily(name, kind, help_text, collect, unit))
+
+    def _label_text(self, labels):
+        text = self._labels.get(labels)
+        if text is None:
+            if labels:
+                text = '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+            else:
+                text = ''
+            self._labels[labels] = text
+        return text
+
+    def render(self):
+        body = self._body
+        now = self.clock()
+        if body is not None and now - self._rendered_at < self.min_interval:
+            return body
+        with self._lock:
+            if self._body is not None and now - self._rendered_at < self.min_interval:
+                return self._body
+            lines = self._lines
+            parts = []
+            changed = False
+            for family in self.families:
+                parts.append(family.header)
+                for suffix, labels, value in family.collect():
+                    key = (family.name, suffix, labels)
+                    cached = lines.get(key)
+                    if cached is None or cached[0] != value:
+                        cached = (value, f"{family.name}{suffix}{self._label_text(labels)} {format_value(value)}\n".encode('utf-8'))
+                        lines[key] = cached
+                        changed = True
+                    parts.append(cached[1])
+            parts.append(b"# EOF\n")
+            if changed or self._body is None or len(parts) != self._parts:
+                self._body = b''.join(parts)
+                self._parts = len(parts)
+            self._rendered_at = now
+            return self._body
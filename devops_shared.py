@@ -0,0 +1,249 @@
+"""Shared-memory counters so every gunicorn worker reports the same totals"""
+import contextlib
+import fcntl
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+import weakref
+
+MAGIC = int.from_bytes(b'DEVOPSMT', 'little')
+LAYOUT_VERSION = 1
+WORD = 8
+ROW_ALIGN = 8  # words, one 64-byte cache line per row so shards never share a line
+
+# Header row: magic, layout version, column count, row count, created_at (microseconds),
+# then the high-water mark of claimed rows so reads never scan the unused tail, then the
+# generation (e.g. the owning master's start time) the table was initialised for
+_HEADER = struct.Struct('<qqqqq')
+_ROWS_USED = _HEADER.size // WORD
+_GENERATION = _ROWS_USED + 1
+
+
+def master_table_path(master_pid):
+    """Default counter file of one gunicorn master, shared by all of its workers.
+
+    gunicorn.conf.py creates a private directory for it in the master
+    (DEVOPS_METRICS_DIR), the shared temp directory is only the fallback.
+    """
+    directory = os.environ.get('DEVOPS_METRICS_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, f"devops-metrics-{master_pid}.bin")
+
+
+def open_private(path):
+    """Open (or create) a file only this user can read and write, refusing anything else.
+
+    O_NOFOLLOW keeps a symlink planted at a predictable path from redirecting
+    the writes, the ownership and mode checks keep another user's file out.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    info = os.fstat(fd)
+    if not stat.S_ISREG(info.st_mode) or info.st_uid != os.geteuid() or info.st_mode & 0o077:
+        os.close(fd)
+        raise RuntimeError(f"Refusing shared metrics file {path}: not a regular file private to this user")
+    return fd
+
+
+def process_start_time(pid):
+    """Start time of a process in clock ticks since boot (0 when unknown), tells reused pids apart"""
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            return int(handle.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class SharedCounters:
+    """Fixed-layout int64 counter table backed by an mmap'd file.
+
+    Every thread of every process leases its own row (a shard) and is the only
+    writer of that row, so updates are plain memory stores with no lock and no
+    IPC, and no increment is ever lost. Reads sum the column across all rows.
+    Rows released by finished threads go back to the process free list with
+    their counts intact; rows left behind by dead workers are handed to the
+    next worker that needs one, so totals survive thread churn and respawns.
+    Without a path the table lives in anonymous memory and is per process.
+    A table whose stored generation differs from `generation` (left behind
+    by an earlier owner, e.g. a killed master whose pid was reused) is reset
+    on first attach instead of carrying its counts and start time over.
+    """
+
+    def __init__(self, columns, path=None, rows=1024, generation=None):
+        self.columns = tuple(columns)
+        self.rows = rows
+        self._path = path
+        self._generation = generation
+        self._index = {name: position + 1 for position, name in enumerate(self.columns)}
+        self._stride = -(-(len(self.columns) + 1) // ROW_ALIGN) * ROW_ALIGN
+        self._size = (rows + 1) * self._stride * WORD
+        self._lock = threading.Lock()
+        self._created = time.time()
+        self._fd = None
+        self._detach()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _detach(self):
+        self._mmap = None
+        self._view = None
+        self._base = None  # process fallback row, written under _lock once the table is full
+        self._started_at = None
+        self._local = threading.local()
+        self._free_rows = []
+
+    def _after_fork(self):
+        # Forked children must lease their own rows, never keep writing the parent's.
+        # flock() locks belong to the open file, so the inherited descriptor is useless too.
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._lock = threading.Lock()
+        self._detach()
+
+    @property
+    def path(self):
+        return self._path() if callable(self._path) else self._path
+
+    @property
+    def generation(self):
+        return self._generation() if callable(self._generation) else self._generation
+
+    @property
+    def shared(self):
+        return self.path is not None
+
+    @contextlib.contextmanager
+    def _table_lock(self):
+        """Cross-process lock for row claims, nothing extra for the private table"""
+        if self._fd is None:
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _attach(self):
+        with self._lock:
+            if self._base is not None:
+                return
+            path = self.path
+            if path is None:
+                mm = mmap.mmap(-1, self._size)
+            else:
+                self._fd = open_private(path)
+                with self._table_lock():
+                    if os.fstat(self._fd).st_size < self._size:
+                        os.ftruncate(self._fd, self._size)
+                mm = mmap.mmap(self._fd, self._size)
+            view = memoryview(mm).cast('q')
+            with self._table_lock():
+                self._init_header(mm)
+                base = self._claim_row(view)
+            if base is None:
+                raise RuntimeError(f"No free rows left in shared metrics table ({self.rows} rows)")
+            self._mmap = mm
+            self._view = view
+            self._base = base
+
+    def _init_header(self, mm):
+        magic, version, columns, rows, created = _HEADER.unpack_from(mm, 0)
+        generation = self.generation
+        stale = generation is not None and struct.unpack_from('<q', mm, _GENERATION * WORD)[0] != generation
+        if magic != MAGIC or stale:
+            mm[:] = bytes(len(mm))
+            created = int(self._created * 1000000)
+            _HEADER.pack_into(mm, 0, MAGIC, LAYOUT_VERSION, len(self.columns), self.rows, created)
+            struct.pack_into('<q', mm, _GENERATION * WORD, generation or 0)
+        elif (version, columns, rows) != (LAYOUT_VERSION, len(self.columns), self.rows):
+            raise RuntimeError(f"Shared metrics file {self.path} has an incompatible layout")
+        self._started_at = created / 1000000.0
+
+    def _claim_row(self, view):
+        """Take an unowned row, or one left behind by a dead process (caller holds the table lock)"""
+        pid = os.getpid()
+        for row in range(1, self.rows + 1):
+            base = row * self._stride
+            owner = view[base]
+            if owner == 0 or (owner != pid and not _alive(owner)):
+                view[base] = pid
+                if row > view[_ROWS_USED]:
+                    view[_ROWS_USED] = row
+                return base
+        return None
+
+    def _lease(self):
+        """Give the calling thread a row of its own for as long as it lives"""
+        if self._base is None:
+            self._attach()
+        with self._lock:
+            if self._free_rows:
+                base = self._free_rows.pop()
+            else:
+                with self._table_lock():
+                    base = self._claim_row(self._view)
+                if base is None:
+                    # Table exhausted: share the process fallback row under the lock
+                    base = self._base
+        lease = _Lease()
+        if base != self._base:
+            weakref.finalize(lease, self._release, os.getpid(), self._free_rows, base).atexit = False
+        self._local.lease = lease
+        self._local.base = base
+        return base
+
+    def _release(self, pid, free_rows, base):
+        # Runs when the owning thread exits; the row keeps its counts for the next thread
+        if pid == os.getpid():
+            with self._lock:
+                free_rows.append(base)
+
+    @property
+    def started_at(self):
+        """Creation time of the table, shared by every worker"""
+        if self._base is None:
+            self._attach()
+        return self._started_at
+
+    def incr(self, name, amount=1):
+        try:
+            base = self._local.base
+        except AttributeError:
+            base = self._lease()
+        if base == self._base:
+            with self._lock:
+                self._view[base + self._index[name]] += amount
+            return
+        self._view[base + self._index[name]] += amount
+
+    def value(self, name):
+        if self._base is None:
+            self._attach()
+        view, stride = self._view, self._stride
+        return sum(view[stride + self._index[name]:(view[_ROWS_USED] + 1) * stride:stride])
+
+    def snapshot(self):
+        """All columns merged across every worker"""
+        if self._base is None:
+            self._attach()
+        view, stride = self._view, self._stride
+        end = (view[_ROWS_USED] + 1) * stride
+        return {name: sum(view[stride + offset:end:stride]) for name, offset in self._index.items()}
+
+
+class _Lease:
+    """Thread-local token whose collection hands the row back to the free list"""
+    __slots__ = ('__weakref__',)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
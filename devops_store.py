@@ -0,0 +1,448 @@
+"""Persistent deployment and build artifact history (SQLite in WAL mode)"""
+import collections
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deployments (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    deployment_id TEXT NOT NULL UNIQUE,
+    build_number TEXT NOT NULL,
+    ts REAL NOT NULL,
+    status TEXT NOT NULL,
+    record TEXT NOT NULL,
+    environment TEXT,
+    git_branch TEXT
+);
+CREATE INDEX IF NOT EXISTS deployments_build_number ON deployments (build_number);
+CREATE INDEX IF NOT EXISTS deployments_ts ON deployments (ts);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    artifact_id TEXT NOT NULL UNIQUE,
+    deployment_id TEXT,
+    ts REAL NOT NULL,
+    record TEXT NOT NULL,
+    name TEXT,
+    version TEXT
+);
+CREATE INDEX IF NOT EXISTS artifacts_deployment_id ON artifacts (deployment_id);
+
+-- Jenkins build/stage webhooks, one row per (job, build, kind, stage) so retried deliveries are ignored
+CREATE TABLE IF NOT EXISTS pipeline_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    build_number TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    stage TEXT NOT NULL DEFAULT '',
+    ts REAL NOT NULL,
+    record TEXT NOT NULL,
+    UNIQUE (job, build_number, kind, stage)
+);
+CREATE INDEX IF NOT EXISTS pipeline_events_ts ON pipeline_events (ts);
+
+CREATE TABLE IF NOT EXISTS totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Created once the filter columns are known to exist (see _migrate)
+FILTER_INDEXES = """
+CREATE INDEX IF NOT EXISTS deployments_status_seq ON deployments (status, seq);
+CREATE INDEX IF NOT EXISTS deployments_branch_seq ON deployments (git_branch, seq);
+CREATE INDEX IF NOT EXISTS artifacts_name_seq ON artifacts (name, seq);
+CREATE INDEX IF NOT EXISTS artifacts_version_seq ON artifacts (version, seq);
+"""
+
+# Running aggregates kept in `totals`, one row per (dimension, value)
+AGGREGATE_DIMENSIONS = ('status', 'environment', 'branch', 'day')
+
+
+class DeploymentStore:
+    """Append-only deployment/artifact log with a bounded in-memory window.
+
+    Records are written once and never updated. SQLite keeps the indexes
+    (deployment_id, build_number, time, artifact id, name and version) on
+    disk, so startup only reads the newest `ring_size` rows into memory and
+    memory stays flat no matter how much history accumulates. Every gunicorn worker opens the same file, so
+    all of them see the same history.
+    """
+
+    def __init__(self, path, ring_size=100, retention=0, compact_every=10000, pipeline_retention_days=0):
+        self.path = path
+        self.ring_size = ring_size
+        self.retention = retention  # newest N deployments kept on disk, 0 keeps everything
+        self.pipeline_retention_days = pipeline_retention_days  # 0 keeps every pipeline event
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inherited = []
+        self._deployments = collections.deque(maxlen=ring_size)
+        self._artifacts = collections.deque(maxlen=ring_size)
+        self._last_seq = {'deployments': 0, 'artifacts': 0}
+        self._writes = 0
+        os.register_at_fork(after_in_child=self._after_fork)
+        self._load()
+
+    def _after_fork(self):
+        # SQLite connections must never be used (or closed) across fork(): park the
+        # parent's, the rings stay valid and catch up on the next read
+        self._inherited.append(self._local)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA cache_size=-2048")  # 2MB page cache per connection
+            self._local.connection = connection
+        return connection
+
+    def _load(self):
+        connection = self._connect()
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Only takes effect on a fresh database, lets compaction hand pages back to the OS
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.executescript(SCHEMA)
+        self._migrate(connection)
+        connection.executescript(FILTER_INDEXES)
+        with self._lock:
+            self._refresh('deployments', self._deployments)
+            self._refresh('artifacts', self._artifacts)
+
+    def _migrate(self, connection):
+        """Add the filter and lookup columns (and backfill them) on databases created before them"""
+        with self._transaction(connection):
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(deployments)")}
+            if 'git_branch' not in columns:
+                connection.execute("ALTER TABLE deployments ADD COLUMN environment TEXT")
+                connection.execute("ALTER TABLE deployments ADD COLUMN git_branch TEXT")
+                connection.execute(
+                    "UPDATE deployments SET environment = json_extract(record, '$.environment'), "
+                    "git_branch = json_extract(record, '$.git_branch')"
+                )
+                for name, expression in (('environment', "COALESCE(environment, 'unknown')"),
+                                         ('branch', "COALESCE(git_branch, 'unknown')"),
+                                         ('day', "date(ts, 'unixepoch')")):
+                    connection.execute(
+                        f"INSERT OR REPLACE INTO totals (name, value) "
+                        f"SELECT '{name}:' || {expression}, COUNT(*) FROM deployments GROUP BY {expression}"
+                    )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(artifacts)")}
+            if 'version' not in columns:
+                connection.execute("ALTER TABLE artifacts ADD COLUMN name TEXT")
+                connection.execute("ALTER TABLE artifacts ADD COLUMN version TEXT")
+                # Older artifact records carry no version, take it from their deployment
+                connection.execute(
+                    "UPDATE artifacts SET name = json_extract(record, '$.name'), "
+                    "version = COALESCE(json_extract(record, '$.version'), "
+                    "(SELECT json_extract(d.record, '$.version') FROM deployments d "
+                    "WHERE d.deployment_id = artifacts.deployment_id))"
+                )
+
+    @contextlib.contextmanager
+    def _transaction(self, connection):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _refresh(self, table, ring):
+        """Pull rows other workers appended since we last looked (caller holds the lock)"""
+        rows = self._connect().execute(
+            f"SELECT seq, record FROM {table} WHERE seq > ? ORDER BY seq DESC LIMIT ?",
+            (self._last_seq[table], self.ring_size)
+        ).fetchall()
+        for seq, record in reversed(rows):
+            ring.append(json.loads(record))
+        if rows:
+            self._last_seq[table] = rows[0][0]
+
+    def _latest_seq(self, table):
+        row = self._connect().execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    def record(self, deployment, artifact, ts):
+        """Append one deployment and its build artifact in a single transaction"""
+        connection = self._connect()
+        day = datetime.datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d')
+        with self._lock:
+            with self._transaction(connection):
+                connection.execute(
+                    "INSERT INTO deployments (deployment_id, build_number, ts, status, environment, git_branch, record) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (deployment['deployment_id'], deployment['build_number'], ts, deployment['status'],
+                     deployment['environment'], deployment['git_branch'], json.dumps(deployment))
+                )
+                connection.execute(
+                    "INSERT INTO artifacts (artifact_id, deployment_id, ts, name, version, record) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (artifact['artifact_id'], deployment['deployment_id'], ts, artifact['name'],
+                     artifact.get('version'), json.dumps(artifact))
+                )
+                # Aggregates are maintained here so reads never scan the history
+                connection.executemany(
+                    "INSERT INTO totals (name, value) VALUES (?, 1) "
+                    "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                    [('deployments',), (f"status:{deployment['status']}",),
+                     (f"environment:{deployment['environment']}",), (f"branch:{deployment['git_branch']}",),
+                     (f"day:{day}",)]
+                )
+            self._refresh('deployments', self._deployments)
+            self._refresh('artifacts', self._artifacts)
+            self._writes += 1
+            compact = self.compact_every and self._writes % self.compact_every == 0
+        if compact:
+            self.compact()
+
+    def record_many(self, records, chunk_size=500):
+        """Append (deployment, artifact, ts) triples, yielding the inserted flags of each chunk.
+
+        `records` may be a generator, it is consumed chunk by chunk and every
+        chunk is one transaction, so memory stays bounded by the chunk size
+        and other workers can write between chunks. Each chunk is pulled
+        (read and validated, e.g. from a slow upload) before the lock is
+        taken, which is then held only for the insert. Deployments whose id
+        is already recorded are skipped (flag False), so a backfill can safely
+        be retried; one bad id never aborts the batch.
+        """
+        connection = self._connect()
+        iterator = iter(records)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            inserted = []
+            totals = collections.Counter()
+            with self._lock:
+                with self._transaction(connection):
+                    for deployment, artifact, ts in chunk:
+                        cursor = connection.execute(
+                            "INSERT INTO deployments (deployment_id, build_number, ts, status, environment, git_branch, record) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (deployment_id) DO NOTHING",
+                            (deployment['deployment_id'], deployment['build_number'], ts, deployment['status'],
+                             deployment['environment'], deployment['git_branch'], json.dumps(deployment))
+                        )
+                        if not cursor.rowcount:
+                            inserted.append(False)
+                            continue
+                        connection.execute(
+                            "INSERT INTO artifacts (artifact_id, deployment_id, ts, name, version, record) "
+                            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (artifact_id) DO NOTHING",
+                            (artifact['artifact_id'], deployment['deployment_id'], ts, artifact['name'],
+                             artifact.get('version'), json.dumps(artifact))
+                        )
+                        totals.update(('deployments', f"status:{deployment['status']}",
+                                       f"environment:{deployment['environment']}",
+                                       f"branch:{deployment['git_branch']}",
+                                       f"day:{datetime.datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d')}"))
+                        inserted.append(True)
+                    connection.executemany(
+                        "INSERT INTO totals (name, value) VALUES (?, ?) "
+                        "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                        totals.items()
+                    )
+                self._refresh('deployments', self._deployments)
+                self._refresh('artifacts', self._artifacts)
+                before = self._writes
+                self._writes += sum(inserted)
+                compact = self.compact_every and self._writes // self.compact_every > before // self.compact_every
+            if compact:
+                self.compact()
+            yield inserted
+
+    def record_pipeline_events(self, events):
+        """Append Jenkins events (dicts with job, build_number, event, stage, ts) in one transaction.
+
+        Returns one inserted flag per event, False for a delivery already recorded.
+        """
+        connection = self._connect()
+        inserted = []
+        with self._lock, self._transaction(connection):
+            for event in events:
+                cursor = connection.execute(
+                    "INSERT INTO pipeline_events (job, build_number, kind, stage, ts, record) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (job, build_number, kind, stage) DO NOTHING",
+                    (event['job'], event['build_number'], event['event'], event.get('stage') or '',
+                     event['ts'], json.dumps(event))
+                )
+                inserted.append(bool(cursor.rowcount))
+        return inserted
+
+    def latest_pipeline_seq(self):
+        return self._latest_seq('pipeline_events')
+
+    def pipeline_events_since(self, seq, since=0.0, limit=10000):
+        """(seq, event) pairs recorded after `seq` with ts >= since, oldest first"""
+        rows = self._connect().execute(
+            "SELECT seq, record FROM pipeline_events WHERE seq > ? AND ts >= ? ORDER BY seq LIMIT ?",
+            (seq, since, limit)
+        ).fetchall()
+        return [(row_seq, json.loads(record)) for row_seq, record in rows]
+
+    def recent_deployments(self, limit=10):
+        """Newest deployments, oldest first, served from the in-memory window"""
+        return self._recent('deployments', self._deployments, limit)
+
+    def recent_artifacts(self, limit=10):
+        return self._recent('artifacts', self._artifacts, limit)
+
+    def _recent(self, table, ring, limit):
+        with self._lock:
+            if self._latest_seq(table) > self._last_seq[table]:
+                self._refresh(table, ring)
+            items = list(ring)
+        if limit < len(items):
+            items = items[-limit:]
+        return items
+
+    def ping(self):
+        """Health probe: raises if the database cannot be read"""
+        self._connect().execute("SELECT 1 FROM totals LIMIT 1").fetchall()
+        return {"path": self.path}
+
+    def total_deployments(self):
+        row = self._connect().execute("SELECT value FROM totals WHERE name = 'deployments'").fetchone()
+        return row[0] if row else 0
+
+    def statistics(self, days=30):
+        """All-time deployment counts per status, environment, branch and (recent) day.
+
+        Read straight from the aggregates maintained at insert time, so the
+        cost depends on the number of distinct keys, not on the history size.
+        """
+        first_day = (datetime.datetime.utcnow() - datetime.timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        statistics = {f"by_{dimension}": {} for dimension in AGGREGATE_DIMENSIONS}
+        for name, value in self._connect().execute("SELECT name, value FROM totals WHERE name != 'deployments'"):
+            dimension, _, key = name.partition(':')
+            if dimension == 'day' and key < first_day:
+                continue
+            if dimension in AGGREGATE_DIMENSIONS:
+                statistics[f"by_{dimension}"][key] = value
+        return statistics
+
+    def page(self, limit=10, cursor=None, status=None, branch=None, since=None, until=None):
+        """One page of deployments, newest first, plus the cursor for the next page.
+
+        The cursor is the sequence number of the last row returned. Without a
+        time range pages follow seq, through the status/branch indexes when
+        filtered. With one they follow (ts, seq) down the ts index (whose
+        entries end in the rowid, seq), so a deep `until` or rows backfilled
+        with old timestamps start at the right place instead of walking back
+        from the newest row. Either way a page costs O(limit) plus the rows a
+        status/branch filter skips inside the range.
+        """
+        connection = self._connect()
+        clauses, params = [], []
+        time_range = since is not None or until is not None
+        if cursor is not None and time_range:
+            row = connection.execute("SELECT ts FROM deployments WHERE seq = ?", (cursor,)).fetchone()
+            if row is None:
+                return [], None  # removed by retention, and everything older with it
+            # Only one upper bound is served by the index, pass the tighter one
+            if until is None or row[0] < until:
+                clauses.append("(ts, seq) < (?, ?)")
+                params.extend((row[0], cursor))
+                until = None
+        elif cursor is not None:
+            clauses.append("seq < ?")
+            params.append(cursor)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if branch is not None:
+            clauses.append("git_branch = ?")
+            params.append(branch)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        if time_range:
+            # Pinned: given a status/branch filter the planner would rather sort every match
+            source, order = "deployments INDEXED BY deployments_ts", "ts DESC, seq DESC"
+        else:
+            source, order = "deployments", "seq DESC"
+        rows = connection.execute(
+            f"SELECT seq, record FROM {source} {where} ORDER BY {order} LIMIT ?", (*params, limit + 1)
+        ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(record) for _, record in rows[:limit]], next_cursor
+
+    def get_deployment(self, deployment_id):
+        row = self._connect().execute(
+            "SELECT record FROM deployments WHERE deployment_id = ?", (deployment_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_artifact(self, artifact_id):
+        row = self._connect().execute(
+            "SELECT record FROM artifacts WHERE artifact_id = ?", (artifact_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_artifacts(self, name=None, version=None, limit=100):
+        """Artifacts by name and/or version, newest first, each filter served by an index"""
+        clauses, params = [], []
+        if name is not None:
+            clauses.append("name = ?")
+            params.append(name)
+        if version is not None:
+            clauses.append("version = ?")
+            params.append(version)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT record FROM artifacts {where} ORDER BY seq DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def deployments_for_build(self, build_number, limit=100):
+        rows = self._connect().execute(
+            "SELECT record FROM deployments WHERE build_number = ? ORDER BY seq DESC LIMIT ?",
+            (build_number, limit)
+        ).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def deployments_between(self, since, until, limit=100):
+        """Deployments with since <= ts < until (unix seconds), newest first"""
+        rows = self._connect().execute(
+            "SELECT record FROM deployments WHERE ts >= ? AND ts < ? ORDER BY ts DESC LIMIT ?",
+            (since, until, limit)
+        ).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def compact(self):
+        """Apply the retention limits, then fold the WAL back and release free pages"""
+        connection = self._connect()
+        if self.retention:
+            with self._lock, self._transaction(connection):
+                cutoff = connection.execute(
+                    "SELECT seq FROM deployments ORDER BY seq DESC LIMIT 1 OFFSET ?", (self.retention,)
+                ).fetchone()
+                if cutoff:
+                    connection.execute(
+                        "DELETE FROM artifacts WHERE deployment_id IN "
+                        "(SELECT deployment_id FROM deployments WHERE seq <= ?)", cutoff
+                    )
+                    connection.execute("DELETE FROM deployments WHERE seq <= ?", cutoff)
+        if self.pipeline_retention_days:
+            with self._lock, self._transaction(connection):
+                connection.execute("DELETE FROM pipeline_events WHERE ts < ?",
+                                   (time.time() - self.pipeline_retention_days * 86400,))
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.execute("PRAGMA incremental_vacuum")
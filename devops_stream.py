@@ -0,0 +1,228 @@
+"""Server-Sent Events: one publisher per process fans metric deltas out to every client"""
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+
+
+def encode_event(event, data):
+    """One SSE frame, encoded once and written as-is to every subscriber"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class StreamPublisher:
+    """Polls `collect()` once per tick and publishes only the fields that changed.
+
+    The poll runs on a single background thread and only while somebody is
+    listening, so N open dashboards cost one metrics read per tick rather than
+    N. Each delta is serialized once; subscribers block on a shared condition
+    and copy the encoded frames out of a short backlog. Every connection
+    starts with a full snapshot, so a client that reconnects to a different
+    worker never depends on that worker's event history.
+
+    Blocking subscribers each hold a server thread, `max_subscribers` caps
+    them per process (StreamFull beyond it); async ones are not capped.
+    """
+
+    def __init__(self, collect, interval=2.0, heartbeat=15.0, backlog=64, retry_ms=5000, max_subscribers=None):
+        self.collect = collect
+        self.max_subscribers = max_subscribers
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.backlog = backlog
+        self.retry_ms = retry_ms
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # The publisher thread and every subscriber belong to the parent, children start empty
+        self._condition = threading.Condition()
+        self._events = collections.deque(maxlen=self.backlog)  # (seq, encoded frame)
+        self._seq = 0
+        self._state = None
+        self._subscribers = 0
+        self._blocking = 0  # subscribers holding a thread, see max_subscribers
+        self._thread = None
+        self._pid = None
+        self._wakers = {}  # event loop -> _LoopWaker, for subscribe_async()
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def _ensure_started(self):
+        # Caller holds the condition
+        if self._pid != os.getpid():
+            self._thread = threading.Thread(target=self._run, name="devops-stream-publisher", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._subscribers:
+                    self._condition.wait()
+            try:
+                state = self.collect()
+            except Exception:
+                state = None
+            if state is not None:
+                self._publish(state)
+            time.sleep(self.interval)
+
+    def _publish(self, state):
+        with self._condition:
+            previous = self._state or {}
+            delta = {key: value for key, value in state.items() if previous.get(key) != value}
+            self._state = state
+            if not delta:
+                return
+            self._seq += 1
+            self._events.append((self._seq, encode_event('delta', delta)))
+            self._condition.notify_all()
+            wakers = list(self._wakers.values())
+        for waker in wakers:
+            waker.wake()
+
+    def attach(self, bounded=False):
+        """Count a subscriber in, starting the publisher if it is the first"""
+        with self._condition:
+            if bounded and self.max_subscribers is not None and self._blocking >= self.max_subscribers:
+                raise StreamFull(self.max_subscribers)
+            self._subscribers += 1
+            self._blocking += bounded
+            self._ensure_started()
+            self._condition.notify_all()
+
+    def detach(self, bounded=False):
+        with self._condition:
+            self._subscribers -= 1
+            self._blocking -= bounded
+            if not self._subscribers:
+                # Nobody is polling any more, the next subscriber must not see stale state
+                self._state = None
+
+    def current(self):
+        """(cursor, snapshot frame) of the full state, collected now if nobody has yet"""
+        with self._condition:
+            state, seq = self._state, self._seq
+        if state is None:
+            state = self.collect()
+        return seq, encode_event('snapshot', state)
+
+    def frames_since(self, cursor):
+        """(cursor, frames published after `cursor`); None frames when it fell out of the backlog"""
+        with self._condition:
+            return self._frames_since(cursor)
+
+    def _frames_since(self, cursor):
+        # Caller holds the condition
+        if self._seq == cursor:
+            return cursor, b''
+        if not self._events or self._events[0][0] > cursor + 1:
+            return cursor, None
+        return self._seq, b''.join(frame for seq, frame in self._events if seq > cursor)
+
+    def subscribe(self):
+        """Frames for one client (blocking), or StreamFull when max_subscribers are connected.
+
+        The subscriber is counted in right away, not on the first frame, and
+        out again when the server closes the returned iterable.
+        """
+        self.attach(bounded=True)
+        return _Subscription(self, self._frames())
+
+    def _frames(self):
+        yield self.retry_frame()
+        cursor, frame = self.current()
+        yield frame
+        while True:
+            with self._condition:
+                if self._seq == cursor:
+                    self._condition.wait(self.heartbeat)
+                cursor, frames = self._frames_since(cursor)
+            if frames is None:
+                cursor, frame = self.current()
+                yield frame
+            else:
+                yield frames or KEEPALIVE
+
+    async def subscribe_async(self):
+        """Frames for one client on an asyncio event loop, no thread per connection.
+
+        All subscribers on a loop share one waker, so a publish costs one
+        call_soon_threadsafe per loop however many clients are connected.
+        """
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            waker = self._wakers.get(loop)
+            if waker is None:
+                waker = self._wakers[loop] = _LoopWaker(loop)
+        self.attach()
+        try:
+            yield self.retry_frame()
+            # collect() may query the database, never on the loop
+            cursor, frame = await loop.run_in_executor(None, self.current)
+            yield frame
+            while True:
+                event = waker.event
+                cursor, frames = self.frames_since(cursor)
+                if frames == b'':
+                    try:
+                        await asyncio.wait_for(event.wait(), self.heartbeat)
+                    except asyncio.TimeoutError:
+                        yield KEEPALIVE
+                    continue
+                if frames is None:
+                    cursor, frames = await loop.run_in_executor(None, self.current)
+                yield frames
+        finally:
+            self.detach()
+
+    def retry_frame(self):
+        return f"retry: {self.retry_ms}\n\n".encode('ascii')
+
+
+KEEPALIVE = b": keepalive\n\n"
+
+
+class StreamFull(Exception):
+    """Every blocking subscriber slot of this process is taken"""
+
+
+class _Subscription:
+    """Frames of one blocking subscriber; WSGI servers call close() even when nothing was sent"""
+
+    def __init__(self, publisher, frames):
+        self._publisher = publisher
+        self._frames = frames
+        self._closed = False
+
+    def __iter__(self):
+        return self._frames
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._frames.close()
+            self._publisher.detach(bounded=True)
+
+
+class _LoopWaker:
+    """Wakes every subscriber waiting on one event loop, callable from any thread"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self._fire)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _fire(self):
+        event, self.event = self.event, asyncio.Event()
+        event.set()
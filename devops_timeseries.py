@@ -0,0 +1,153 @@
+"""Background system-metrics sampler with fixed-size multi-resolution history"""
+import array
+import os
+import threading
+import time
+
+from devops_probes import read_cpu_times, read_meminfo, read_process_rss, disk_usage
+
+METRICS = ('cpu_percent', 'memory_percent', 'process_rss_bytes', 'disk_used_bytes', 'disk_used_percent',
+           'load_average')
+
+# resolution -> (seconds per slot, slots kept): an hour of seconds, a day of minutes, 30 days of hours
+RESOLUTIONS = {
+    '1s': (1, 3600),
+    '1m': (60, 1440),
+    '1h': (3600, 720),
+}
+
+
+class Ring:
+    """Preallocated min/sum/max/count slots for one metric at one resolution.
+
+    Every sample is folded straight into the slot its timestamp falls in, so
+    the coarser resolutions roll up as samples arrive; a slot is reset when
+    the ring wraps round to it again.
+    """
+
+    def __init__(self, step, size):
+        self.step = step
+        self.size = size
+        self.slots = array.array('q', [-1]) * size   # absolute slot number held at each position
+        self.mins = array.array('d', [0.0]) * size
+        self.maxs = array.array('d', [0.0]) * size
+        self.sums = array.array('d', [0.0]) * size
+        self.counts = array.array('L', [0]) * size
+
+    def add(self, timestamp, value):
+        slot = int(timestamp // self.step)
+        position = slot % self.size
+        if self.slots[position] != slot:
+            self.slots[position] = slot
+            self.mins[position] = self.maxs[position] = self.sums[position] = value
+            self.counts[position] = 1
+            return
+        if value < self.mins[position]:
+            self.mins[position] = value
+        if value > self.maxs[position]:
+            self.maxs[position] = value
+        self.sums[position] += value
+        self.counts[position] += 1
+
+    def points(self, since, now):
+        """[timestamp, min, avg, max] per filled slot, oldest first"""
+        last = int(now // self.step)
+        first = max(last - self.size + 1, int(since // self.step) if since is not None else 0)
+        points = []
+        for slot in range(first, last + 1):
+            position = slot % self.size
+            if self.slots[position] != slot:
+                continue
+            count = self.counts[position]
+            points.append([slot * self.step, self.mins[position],
+                           round(self.sums[position] / count, 3), self.maxs[position]])
+        return points
+
+
+class SystemSampler:
+    """Reads /proc and statvfs every `interval` seconds into one Ring per metric and resolution.
+
+    Memory is allocated up front and never grows. Each worker samples on its
+    own thread, started lazily and again after fork() (process_rss_bytes is
+    that worker's own RSS).
+    """
+
+    def __init__(self, interval=1.0, disk_path='/', clock=time.time):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.clock = clock
+        self.rings = {metric: {name: Ring(step, size) for name, (step, size) in RESOLUTIONS.items()}
+                      for metric in METRICS}
+        self._latest = {}
+        self._pid = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._pid = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                thread = threading.Thread(target=self._run, name="devops-system-sampler", daemon=True)
+                thread.start()
+                self._pid = os.getpid()
+
+    def latest(self):
+        """Most recent value of every metric (None until first sampled)"""
+        self.ensure_started()
+        return {metric: self._latest.get(metric) for metric in METRICS}
+
+    def series(self, metric, resolution, since=None):
+        self.ensure_started()
+        ring = self.rings[metric][resolution]
+        with self._lock:
+            return ring.points(since, self.clock())
+
+    def read(self, last_cpu):
+        """One sample of every metric, plus the cpu counters to diff the next one against"""
+        values = {}
+        busy, total = read_cpu_times()
+        if last_cpu is not None and total > last_cpu[1]:
+            values['cpu_percent'] = round(100.0 * (busy - last_cpu[0]) / (total - last_cpu[1]), 2)
+        info = read_meminfo()
+        mem_total = info.get('MemTotal', 0)
+        if mem_total:
+            available = info.get('MemAvailable', info.get('MemFree', 0))
+            values['memory_percent'] = round(100.0 * (mem_total - available) / mem_total, 2)
+        values['process_rss_bytes'] = float(read_process_rss())
+        disk_total, disk_free = disk_usage(self.disk_path)
+        values['disk_used_bytes'] = float(disk_total - disk_free)
+        if disk_total:
+            values['disk_used_percent'] = round(100.0 * (disk_total - disk_free) / disk_total, 2)
+        values['load_average'] = os.getloadavg()[0]
+        return values, (busy, total)
+
+    def record(self, timestamp, values):
+        with self._lock:
+            for metric, value in values.items():
+                for ring in self.rings[metric].values():
+                    ring.add(timestamp, value)
+        self._latest = values
+
+    def _run(self):
+        last_cpu = None
+        next_due = time.monotonic()
+        while True:
+            try:
+                values, last_cpu = self.read(last_cpu)
+                self.record(self.clock(), values)
+            except OSError:
+                pass  # no /proc (non-Linux) or the disk path went away, try again next tick
+            next_due += self.interval
+            delay = next_due - time.monotonic()
+            if delay < 0:
+                # Fell behind (suspended, overloaded): skip the missed ticks instead of bursting
+                next_due = time.monotonic()
+                delay = 0
+            time.sleep(delay)
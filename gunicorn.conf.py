@@ -0,0 +1,79 @@
+"""Gunicorn settings for the DevOps app: preloaded, copy-on-write friendly workers
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With preload_app the master imports app.py once, builds everything that never
+changes (compiled templates, pre-serialized payloads, routing rules, config)
+and freezes it out of the garbage collector, then forks the workers. The
+workers share those pages with the master instead of each importing and
+building its own copy, and a respawned worker is serving as soon as it has
+started its background threads. Per-worker state (log writer, health probes,
+system sampler, the shared counter table) is set up after fork.
+
+GUNICORN_PRELOAD=0 restores a fresh import per worker, e.g. for --reload.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+import tempfile
+
+bind = [f"0.0.0.0:{os.environ.get('PORT', '5000')}"]
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() not in ('0', 'false', 'no', 'off')
+pidfile = os.environ.get('GUNICORN_PIDFILE') or None
+
+# Admission control shares out one worker's threads
+os.environ.setdefault('DEVOPS_ADMISSION_CAPACITY', str(threads))
+
+# The default counter file goes in a directory only this user can enter, under a name nobody
+# can predict. Workers inherit the variable; a SIGHUP re-run keeps the existing directory
+if not os.environ.get('DEVOPS_METRICS_FILE') and not os.environ.get('DEVOPS_METRICS_DIR'):
+    os.environ['DEVOPS_METRICS_DIR'] = tempfile.mkdtemp(prefix='devops-metrics-')
+
+if preload_app:
+    # No collections while the app is imported: a collection would only touch (and, once
+    # forked, copy) objects that all live until freeze()
+    gc.disable()
+
+
+def when_ready(server):
+    # The app is imported by now, the workers are forked next
+    app = sys.modules.get('app')
+    if preload_app and app is not None:
+        app.prepare_preload()
+        gc.freeze()
+    gc.enable()
+
+
+def pre_fork(server, worker):
+    # Whatever the master allocated since (e.g. before a respawn) is shared as well
+    if preload_app:
+        gc.freeze()
+    # A SIGHUP re-runs this file, and with it the gc.disable() above, but never when_ready:
+    # neither the master nor any worker forked after a reload may keep a disabled collector
+    gc.enable()
+
+
+def post_worker_init(worker):
+    app = sys.modules.get('app')
+    if app is not None:
+        app.init_worker()
+
+
+def on_exit(server):
+    # The default counter file is per master, nothing reads it once the master is gone
+    if not os.environ.get('DEVOPS_METRICS_FILE'):
+        from devops_shared import master_table_path
+        path = master_table_path(server.pid)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        if os.environ.get('DEVOPS_METRICS_DIR'):
+            try:
+                os.rmdir(os.environ['DEVOPS_METRICS_DIR'])
+            except OSError:
+                pass  # not empty, e.g. another master's table
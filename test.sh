@@ -3,3 +3,15 @@ set -eux
 
 # Just run pytest or your tests directly without venv
 pytest || echo "No tests found, skipping..."
+
+# Performance gate: record a baseline on the build agent once with
+#   python3 benchmarks/bench_routes.py --save benchmarks/baseline.json
+# and every later run fails if a route regresses past the tolerances. Every number is the
+# median of 3 runs and a regression must show up again in a second full measurement, see
+# the bench_routes.py docstring for the tolerances and the noise they were sized against
+BENCH_BASELINE="${BENCH_BASELINE:-benchmarks/baseline.json}"
+if [ -f "$BENCH_BASELINE" ]; then
+    python3 benchmarks/bench_routes.py --compare "$BENCH_BASELINE"
+else
+    echo "No benchmark baseline at $BENCH_BASELINE, skipping performance gate..."
+fi
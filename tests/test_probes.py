@@ -0,0 +1,125 @@
+"""TcpProbe and HttpProbe against listeners on the loopback interface"""
+import http.server
+import socket
+import threading
+import time
+
+import pytest
+
+from devops_probes import FAILING, PASSING, CallableProbe, HttpProbe, ProbeScheduler, TcpProbe
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(0)
+    yield sock
+    sock.close()
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def http_server():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(int(self.path.strip('/') or 200))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_tcp_probe_passes_when_the_port_accepts(listener):
+    port = listener.getsockname()[1]
+    status, detail = TcpProbe('db', '127.0.0.1', port, timeout=1.0).check()
+    assert status == PASSING
+    assert detail == {"target": f"tcp://127.0.0.1:{port}"}
+
+
+def test_tcp_probe_raises_when_the_port_is_closed(closed_port):
+    with pytest.raises(ConnectionRefusedError):
+        TcpProbe('db', '127.0.0.1', closed_port, timeout=1.0).check()
+
+
+def test_tcp_probe_times_out_when_the_backlog_is_full(listener):
+    # Nothing accepts, so once the backlog is full the handshake is never answered
+    port = listener.getsockname()[1]
+    queued = [socket.create_connection(('127.0.0.1', port), timeout=1.0)]
+    try:
+        started = time.monotonic()
+        with pytest.raises(socket.timeout):
+            TcpProbe('db', '127.0.0.1', port, timeout=0.2).check()
+        assert time.monotonic() - started < 1.0
+    finally:
+        for sock in queued:
+            sock.close()
+
+
+def test_http_probe_passes_on_success(http_server):
+    status, detail = HttpProbe('api', f"{http_server}/200", timeout=1.0).check()
+    assert status == PASSING
+    assert detail == {"target": f"{http_server}/200", "status_code": 200}
+
+
+def test_http_probe_passes_on_client_errors(http_server):
+    status, detail = HttpProbe('api', f"{http_server}/404", timeout=1.0).check()
+    assert status == PASSING
+    assert detail["status_code"] == 404
+
+
+def test_http_probe_fails_on_server_errors(http_server):
+    status, detail = HttpProbe('api', f"{http_server}/503", timeout=1.0).check()
+    assert status == FAILING
+    assert detail["status_code"] == 503
+
+
+def test_http_probe_raises_when_the_port_is_closed(closed_port):
+    with pytest.raises(ConnectionRefusedError):
+        HttpProbe('api', f"http://127.0.0.1:{closed_port}/", timeout=1.0).check()
+
+
+def test_http_probe_times_out_when_the_server_never_answers(listener):
+    # The kernel completes the handshake, nothing ever reads the request
+    port = listener.getsockname()[1]
+    started = time.monotonic()
+    with pytest.raises(socket.timeout):
+        HttpProbe('api', f"http://127.0.0.1:{port}/", timeout=0.2).check()
+    assert time.monotonic() - started < 1.0
+
+
+def test_scheduler_reports_failures_and_overruns(closed_port):
+    release = threading.Event()
+    scheduler = ProbeScheduler([
+        TcpProbe('db', '127.0.0.1', closed_port, interval=60.0, timeout=1.0),
+        CallableProbe('stuck', lambda: release.wait() and None, interval=60.0, timeout=0.1)
+    ], tick=0.01)
+    try:
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            snapshot = scheduler.snapshot()
+            if all(result["status"] != "pending" for result in snapshot.values()):
+                break
+            time.sleep(0.01)
+        assert snapshot["db"]["status"] == FAILING
+        assert snapshot["db"]["error"].startswith("ConnectionRefusedError")
+        assert snapshot["stuck"] == {"status": FAILING, "error": "timed out after 0.1s",
+                                     "checked_at": snapshot["stuck"]["checked_at"]}
+    finally:
+        release.set()